@@ -1,14 +1,444 @@
 # app/database.py
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 from motor.motor_asyncio import AsyncIOMotorClient
-from decouple import config
+from decouple import config, Csv
+from pymongo import read_preferences
+from pymongo.write_concern import WriteConcern
+from app.utils.cache import BoundedDict
+from app.utils.instrumentation import db_command_listener
+from app.utils.metrics import pool_metrics_listener
+from app.utils.projections import SEAT_PARTITION
+
+logger = logging.getLogger(__name__)
 
 MONGO_DETAILS = config("MONGO_URI", default="mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGO_DETAILS)
-database = client.event_ticketing
+MONGO_DB_NAME = config("MONGO_DB", default="event_ticketing")
+
+# Connection pool and timeouts
+MONGO_MAX_POOL_SIZE = config("MONGO_MAX_POOL_SIZE", default=100, cast=int)
+MONGO_MIN_POOL_SIZE = config("MONGO_MIN_POOL_SIZE", default=0, cast=int)
+MONGO_MAX_IDLE_TIME_MS = config("MONGO_MAX_IDLE_TIME_MS", default=60000, cast=int)
+MONGO_WAIT_QUEUE_TIMEOUT_MS = config("MONGO_WAIT_QUEUE_TIMEOUT_MS", default=5000, cast=int)
+MONGO_CONNECT_TIMEOUT_MS = config("MONGO_CONNECT_TIMEOUT_MS", default=5000, cast=int)
+MONGO_SERVER_SELECTION_TIMEOUT_MS = config("MONGO_SERVER_SELECTION_TIMEOUT_MS", default=5000, cast=int)
+MONGO_SOCKET_TIMEOUT_MS = config("MONGO_SOCKET_TIMEOUT_MS", default=0, cast=int)  # 0 means no timeout
+# Connections opened at startup so the first requests don't pay for handshakes
+MONGO_WARMUP_CONNECTIONS = config("MONGO_WARMUP_CONNECTIONS", default=4, cast=int)
+# Wire compression, in order of preference, e.g. "zstd,snappy,zlib"
+MONGO_COMPRESSORS = config("MONGO_COMPRESSORS", default="", cast=Csv())
+
+# Seat-map reads may go to secondaries; seat, ticket and promo writes wait for a majority
+SEAT_MAP_READ_PREFERENCE = config("MONGO_SEAT_MAP_READ_PREFERENCE", default="primary")
+SEAT_MAP_MAX_STALENESS_SECONDS = config("MONGO_SEAT_MAP_MAX_STALENESS_SECONDS", default=-1, cast=int)
+# Versioned seat-map snapshots and ETags need reads that are at least as new as the version
+SEAT_MAP_FROM_PRIMARY = SEAT_MAP_READ_PREFERENCE == "primary"
+CRITICAL_WRITE_CONCERN = config("MONGO_CRITICAL_WRITE_CONCERN", default="majority")
+CRITICAL_WRITE_TIMEOUT_MS = config("MONGO_CRITICAL_WRITE_TIMEOUT_MS", default=5000, cast=int)
+
+# Seat partitioning: on a sharded cluster, shard "seats" on event_id ("hashed" or "ranged");
+# independently, events with at least this many seats get their own seats collection (0 = never)
+SEATS_SHARD_KEY = config("MONGO_SEATS_SHARD_KEY", default="")
+SEAT_PARTITION_MIN_SEATS = config("SEAT_PARTITION_MIN_SEATS", default=0, cast=int)
+# How long a worker trusts that an event it looked up keeps its seats in the shared collection
+SEAT_PARTITION_LOOKUP_TTL_SECONDS = config("SEAT_PARTITION_LOOKUP_TTL_SECONDS", default=60, cast=float)
+SEAT_PARTITION_LOOKUP_MAX_ENTRIES = config("SEAT_PARTITION_LOOKUP_MAX_ENTRIES", default=100000, cast=int)
+
+# Stored responses for Idempotency-Key retries are kept this long
+IDEMPOTENCY_TTL_SECONDS = config("IDEMPOTENCY_TTL_SECONDS", default=86400, cast=int)
+
+# Python packages each wire compressor needs; zlib is always available
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+_READ_PREFERENCES = {
+    "primary": read_preferences.Primary,
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest,
+}
+
+def _available_compressors():
+    compressors = []
+    for name in MONGO_COMPRESSORS:
+        module = _COMPRESSOR_MODULES.get(name)
+        if module is None or importlib.util.find_spec(module) is None:
+            logger.warning("Mongo compressor %r is not available; skipping it", name)
+            continue
+        compressors.append(name)
+    return compressors
+
+def _read_preference(mode: str, max_staleness: int):
+    if mode not in _READ_PREFERENCES:
+        raise ValueError(f"Unknown read preference {mode!r}")
+    if mode == "primary":
+        return read_preferences.Primary()
+    return _READ_PREFERENCES[mode](max_staleness=max_staleness)
+
+def _write_concern(w: str, wtimeout: int) -> WriteConcern:
+    return WriteConcern(w=int(w) if w.isdigit() else w, wtimeout=wtimeout)
+
+def client_options() -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS or None,
+        "event_listeners": [db_command_listener, pool_metrics_listener],
+    }
+    compressors = _available_compressors()
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+def collection_options() -> Dict[str, Dict[str, Any]]:
+    """Per-collection read preference and write concern overrides."""
+    critical_writes = _write_concern(CRITICAL_WRITE_CONCERN, CRITICAL_WRITE_TIMEOUT_MS)
+    return {
+        "seats": {"write_concern": critical_writes},
+        "tickets": {"write_concern": critical_writes},
+        "promos": {"write_concern": critical_writes},
+        "promo_usage": {"write_concern": critical_writes},
+        # Same documents as "seats", for the seat-map read path only
+        "seat_map": {
+            "name": "seats",
+            "read_preference": _read_preference(SEAT_MAP_READ_PREFERENCE, SEAT_MAP_MAX_STALENESS_SECONDS),
+        },
+    }
+
+class DatabaseResources:
+    """
+    Owns the Motor client and the collection handles built from it.
+
+    The client is created lazily, normally by the app lifespan, and is
+    re-created if the process has forked since, so pre-fork worker servers
+    never share sockets with their parent.
+    """
+
+    def __init__(self):
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._collections: Dict[str, Any] = {}
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._forget)
+
+    def _forget(self) -> None:
+        # A client inherited across fork must not be used, or closed, by the child
+        self._client = None
+        self._collections = {}
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    def connect(self) -> AsyncIOMotorClient:
+        if self._client is None:
+            self._client = AsyncIOMotorClient(MONGO_DETAILS, **client_options())
+            self._collections = {}
+        return self._client
+
+    async def warm_up(self, connections: int = MONGO_WARMUP_CONNECTIONS) -> None:
+        """Open pool connections up front so the first requests don't pay for handshakes."""
+        client = self.connect()
+        try:
+            await asyncio.gather(*(client.admin.command("ping") for _ in range(max(connections, 1))))
+        except Exception:
+            logger.warning("Mongo warm-up failed; connections will be opened on demand", exc_info=True)
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+        self._forget()
+
+    def get_client(self) -> AsyncIOMotorClient:
+        """The current client, created on first use outside the app (scripts, benchmarks)."""
+        return self.connect()
+
+    def get_collection(self, key: str, name: Optional[str] = None):
+        """The collection for `key`, using its options; `name` overrides the collection name."""
+        cache_key = key if name is None else f"{key}:{name}"
+        collection = self._collections.get(cache_key)
+        if collection is None:
+            options = dict(collection_options().get(key, {}))
+            default_name = options.pop("name", key)
+            collection = self.connect()[MONGO_DB_NAME].get_collection(name or default_name, **options)
+            self._collections[cache_key] = collection
+        return collection
+
+resources = DatabaseResources()
+
+def get_client() -> AsyncIOMotorClient:
+    return resources.get_client()
+
+def get_collection(key: str):
+    return resources.get_collection(key)
+
+def get_database():
+    return resources.connect()[MONGO_DB_NAME]
+
+_proxies: Dict[str, "CollectionProxy"] = {}
+_dependencies: Dict[str, Callable[[], Any]] = {}
+
+def collection_dependency(key: str) -> Callable[[], Any]:
+    """
+    FastAPI dependency providing a collection, e.g. `tickets=Depends(collection_dependency("tickets"))`.
+
+    Handlers get the handle from the current process's client, and tests can
+    swap it with `app.dependency_overrides[collection_dependency("tickets")]`.
+    Seat collections are provided as their proxies, which route each call to
+    the event's partition.
+    """
+    dependency = _dependencies.get(key)
+    if dependency is None:
+        proxy = _proxies[key]
+
+        def dependency():
+            if isinstance(proxy, PartitionedCollection):
+                return proxy
+            return resources.get_collection(key)
+
+        _dependencies[key] = dependency
+    return dependency
+
+class CollectionProxy:
+    """
+    Module-level stand-in for a collection that resolves through `resources`.
+
+    Utility modules and background tasks import these at import time, before
+    the lifespan has created the client; nothing connects until the first real
+    use. Route handlers get their collections through `collection_dependency`.
+    """
+
+    def __init__(self, key: str):
+        self._key = key
+        _proxies[key] = self
+
+    def __getattr__(self, attribute: str):
+        return getattr(get_collection(self._key), attribute)
+
+SEAT_INDEX = [("event_id", 1), ("seat_number", 1)]
+
+class SeatPartitions:
+    """
+    Tracks which events keep their seats in a dedicated collection.
+
+    A big on-sale then has its own documents and indexes, and its working set
+    cannot evict every other event's. The set of partitioned events is held in
+    memory, loaded at startup and kept current through the change stream. An
+    event this worker has not heard of (another worker just created it, or
+    there is no change stream) is looked up in seat_partitions before routing;
+    events found to be unpartitioned are remembered for a while.
+    """
+
+    def __init__(self):
+        self.event_ids: Set[str] = set()
+        # event_id -> when the "uses the shared collection" answer expires, monotonic seconds
+        self._shared: Dict[str, float] = BoundedDict(SEAT_PARTITION_LOOKUP_MAX_ENTRIES)
+
+    def collection_name(self, event_id: str) -> Optional[str]:
+        """The dedicated collection for `event_id`, or None if it uses the shared one."""
+        return f"seats_{event_id}" if event_id in self.event_ids else None
+
+    async def resolve(self, event_ids: Iterable[str]) -> None:
+        """Make sure `collection_name` is right for every one of `event_ids`."""
+        now = time.monotonic()
+        unknown = [
+            event_id for event_id in set(event_ids)
+            if event_id not in self.event_ids and self._shared.get(event_id, 0) < now
+        ]
+        # With partitioning off and no partitions seen, there is nothing to find
+        if not unknown or (SEAT_PARTITION_MIN_SEATS <= 0 and not self.event_ids):
+            return
+        found = {doc["_id"] async for doc in partitions_collection.find({"_id": {"$in": unknown}}, SEAT_PARTITION)}
+        self.event_ids.update(found)
+        for event_id in unknown:
+            if event_id in found:
+                continue
+            self._shared.pop(event_id, None)
+            self._shared[event_id] = now + SEAT_PARTITION_LOOKUP_TTL_SECONDS
+
+    def should_partition(self, seat_count: int) -> bool:
+        return SEAT_PARTITION_MIN_SEATS > 0 and seat_count >= SEAT_PARTITION_MIN_SEATS
+
+    async def add(self, event_id: str) -> None:
+        """Give `event_id` its own seats collection; call before inserting its seats."""
+        await get_database()[f"seats_{event_id}"].create_index(SEAT_INDEX, unique=True)
+        await partitions_collection.update_one(
+            {"_id": event_id}, {"$setOnInsert": {"created_at": datetime.now(timezone.utc)}}, upsert=True
+        )
+        self.event_ids.add(event_id)
+        self._shared.pop(event_id, None)
+
+    async def load(self) -> None:
+        self.event_ids = {doc["_id"] async for doc in partitions_collection.find({}, SEAT_PARTITION)}
+
+    def change_handler(self, change: Dict[str, Any]) -> None:
+        event_id = change.get("documentKey", {}).get("_id")
+        if change.get("operationType") == "delete":
+            self.event_ids.discard(event_id)
+        elif event_id is not None:
+            self.event_ids.add(event_id)
+            self._shared.pop(event_id, None)
+
+seat_partitions = SeatPartitions()
+
+# Methods whose first argument is a filter (or pipeline, or documents) carrying the event_id
+_PARTITION_ROUTED = {
+    "find", "find_one", "count_documents", "distinct", "update_one", "update_many",
+    "delete_one", "delete_many", "find_one_and_update", "find_one_and_delete",
+    "replace_one", "aggregate", "insert_one", "insert_many",
+}
+# Of those, the ones returning a cursor rather than a coroutine
+_CURSOR_METHODS = {"find", "aggregate"}
+
+def _routing_event_id(method: str, args, kwargs) -> Any:
+    if method == "insert_one":
+        return (args[0] if args else kwargs["document"]).get("event_id")
+    if method == "insert_many":
+        event_ids = {doc.get("event_id") for doc in (args[0] if args else kwargs["documents"])}
+        return event_ids.pop() if len(event_ids) == 1 else None
+    if method == "aggregate":
+        pipeline = args[0] if args else kwargs.get("pipeline", [])
+        first_stage = pipeline[0] if pipeline else {}
+        return first_stage.get("$match", {}).get("event_id")
+    if method == "distinct":
+        query = args[1] if len(args) > 1 else kwargs.get("filter") or {}
+        return query.get("event_id")
+    query = args[0] if args else kwargs.get("filter") or {}
+    return query.get("event_id")
+
+class PartitionedCollection(CollectionProxy):
+    """
+    Seat collection proxy that routes each call by the `event_id` in its filter.
+
+    Calls for a partitioned event go to that event's own collection, everything
+    else to the shared one, so handlers use it exactly like a plain collection.
+    Queries spanning several events go through `partitions()` instead.
+    """
+
+    async def for_event(self, event_id: str):
+        await seat_partitions.resolve([event_id])
+        return resources.get_collection(self._key, seat_partitions.collection_name(event_id))
+
+    async def partitions(self, event_ids: Iterable[str]) -> List[Tuple[Any, List[str]]]:
+        """Group `event_ids` by the collection holding their seats."""
+        event_ids = list(event_ids)
+        await seat_partitions.resolve(event_ids)
+        groups: Dict[Optional[str], List[str]] = {}
+        for event_id in event_ids:
+            groups.setdefault(seat_partitions.collection_name(event_id), []).append(event_id)
+        return [(resources.get_collection(self._key, name), ids) for name, ids in groups.items()]
+
+    def __getattr__(self, attribute: str):
+        if attribute not in _PARTITION_ROUTED:
+            return super().__getattr__(attribute)
+
+        def routed(*args, **kwargs):
+            event_id = _routing_event_id(attribute, args, kwargs)
+            if isinstance(event_id, str):
+                if attribute in _CURSOR_METHODS:
+                    return _RoutedCursor(self, event_id, attribute, args, kwargs)
+                return _routed_call(self.for_event(event_id), attribute, args, kwargs)
+            if seat_partitions.event_ids:
+                raise ValueError(f"Seat {attribute}() must target a single event_id; use partitions()")
+            return getattr(get_collection(self._key), attribute)(*args, **kwargs)
+        return routed
+
+async def _routed_call(collection, method: str, args, kwargs) -> Any:
+    return await getattr(await collection, method)(*args, **kwargs)
+
+class _RoutedCursor:
+    """Cursor for a routed find/aggregate; the collection is resolved on first read."""
+
+    def __init__(self, proxy: PartitionedCollection, event_id: str, method: str, args, kwargs):
+        self._proxy = proxy
+        self._event_id = event_id
+        self._method = method
+        self._args = args
+        self._kwargs = kwargs
+        # Cursor modifiers (sort, limit, ...) called before the first read
+        self._chain: List[Tuple[str, Any, Any]] = []
+        self._cursor = None
+
+    def __getattr__(self, attribute: str):
+        def chained(*args, **kwargs):
+            self._chain.append((attribute, args, kwargs))
+            return self
+        return chained
+
+    async def _open(self):
+        if self._cursor is None:
+            collection = await self._proxy.for_event(self._event_id)
+            cursor = getattr(collection, self._method)(*self._args, **self._kwargs)
+            for attribute, args, kwargs in self._chain:
+                cursor = getattr(cursor, attribute)(*args, **kwargs)
+            self._cursor = cursor
+        return self._cursor
+
+    async def to_list(self, length: Optional[int] = None) -> List[Any]:
+        return await (await self._open()).to_list(length=length)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await (await self._open()).__anext__()
 
 # Define your collections
-users_collection = database.get_collection("users")
-events_collection = database.get_collection("events")
-tickets_collection = database.get_collection("tickets")
-promos_collection = database.get_collection("promos")
-seats_collection = database.get_collection("seats")
+users_collection = CollectionProxy("users")
+events_collection = CollectionProxy("events")
+tickets_collection = CollectionProxy("tickets")
+promos_collection = CollectionProxy("promos")
+promo_usage_collection = CollectionProxy("promo_usage")
+seats_collection = PartitionedCollection("seats")
+seat_map_collection = PartitionedCollection("seat_map")
+counters_collection = CollectionProxy("event_counters")
+event_stats_collection = CollectionProxy("event_stats")
+rollups_collection = CollectionProxy("sales_rollups")
+leases_collection = CollectionProxy("leases")
+partitions_collection = CollectionProxy("seat_partitions")
+idempotency_collection = CollectionProxy("idempotency_keys")
+rate_limits_collection = CollectionProxy("rate_limits")
+
+async def ensure_indexes():
+    """Create the indexes the seats, tickets, counters, event stats, promo usage, rollups, idempotency keys and rate limits rely on."""
+    await get_collection("seats").create_index(SEAT_INDEX, unique=True)
+    await counters_collection.create_index("event_id", unique=True)
+    # Expiry sweeps and the pending_holds gauge look up reservations by status
+    await tickets_collection.create_index([("status", 1), ("expiry", 1)])
+    await promo_usage_collection.create_index("key")
+    await event_stats_collection.create_index("event_id", unique=True)
+    await rollups_collection.create_index([("event_id", 1), ("hour", 1), ("promo_code", 1)], unique=True)
+    await idempotency_collection.create_index([("user_id", 1), ("key", 1)], unique=True)
+    await idempotency_collection.create_index("created_at", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS)
+    await rate_limits_collection.create_index("expires_at", expireAfterSeconds=0)
+
+async def shard_seats() -> None:
+    """
+    Shard the shared seats collection on event_id when MONGO_SEATS_SHARD_KEY is set.
+
+    "hashed" spreads events evenly across shards; "ranged" keeps each event's
+    seats in order on one shard so seat-map reads stay single-shard.
+    """
+    if not SEATS_SHARD_KEY:
+        return
+    if SEATS_SHARD_KEY == "hashed":
+        key = {"event_id": "hashed"}
+        await get_collection("seats").create_index([("event_id", "hashed")])
+    elif SEATS_SHARD_KEY == "ranged":
+        key = dict(SEAT_INDEX)
+    else:
+        raise ValueError(f"Unknown seats shard key {SEATS_SHARD_KEY!r}")
+    admin = get_client().admin
+    try:
+        await admin.command("enableSharding", MONGO_DB_NAME)
+        await admin.command("shardCollection", f"{MONGO_DB_NAME}.seats", key=key)
+    except Exception:
+        logger.warning("Could not shard the seats collection; is this a mongos?", exc_info=True)
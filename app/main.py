@@ -1,13 +1,81 @@
 # app/main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routes import auth, event_manager, customer
+from app.routes import auth, event_manager, customer, metrics, admin
+from app.database import ensure_indexes, resources, seat_partitions, shard_seats
+from app.routes.customer import sweep_expired_reservations, RESERVATION_SWEEP_SECONDS
+from app.utils.cache import event_cache, promo_cache
+from app.utils.coordination import invalidator, run_as_leader
+from app.utils.demand_pricing import demand_pricing
+from app.utils.inventory import run_reconciliation, inventory_version_change_handler
+from app.utils.instrumentation import DBInstrumentationMiddleware
+from app.utils.metrics import registry, MULTIPROC_DIR
+from app.utils.profiler import ProfilingMiddleware
+from app.utils.lifecycle import InFlightMiddleware, in_flight
+from app.utils.rate_limit import RateLimitMiddleware
+from app.utils.admission import AdmissionControlMiddleware, loop_lag
+from app.utils.responses import FastJSONResponse
+from app.utils.write_behind import run_write_behind
 
-app = FastAPI(title="Event Ticketing System")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The Mongo client is created here, after any worker fork, and warmed up before serving
+    resources.connect()
+    await resources.warm_up()
+    await ensure_indexes()
+    await shard_seats()
+    await seat_partitions.load()
+
+    # Other workers' writes reach this worker's caches through one change stream
+    invalidator.register("events", event_cache.change_handler("id"))
+    invalidator.register("promos", promo_cache.change_handler("code"))
+    invalidator.register("event_counters", demand_pricing.counters_change_handler)
+    invalidator.register("event_counters", inventory_version_change_handler)
+    invalidator.register("seat_partitions", seat_partitions.change_handler)
+
+    # Keep inventory counters and demand-based price multipliers fresh in the background.
+    # Reconciliation and hold expiry run on whichever worker holds the matching lease.
+    background_tasks = [
+        asyncio.create_task(run_reconciliation()),
+        asyncio.create_task(run_as_leader("expire-holds", sweep_expired_reservations, RESERVATION_SWEEP_SECONDS)),
+        asyncio.create_task(demand_pricing.run()),
+        asyncio.create_task(invalidator.run()),
+        # Flushes buffered stats counters; cancelling it at shutdown flushes them one last time
+        asyncio.create_task(run_write_behind()),
+        asyncio.create_task(loop_lag.run()),
+    ]
+    if MULTIPROC_DIR:
+        # Share this worker's metrics with the others behind the same /metrics
+        background_tasks.append(asyncio.create_task(registry.run_publisher()))
+    yield
+
+    # Graceful shutdown: let in-flight requests finish, then stop background work and disconnect
+    await in_flight.drain()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    resources.close()
+
+app = FastAPI(title="Event Ticketing System", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Attribute DB commands to routes (Server-Timing header and /metrics/db)
+app.add_middleware(DBInstrumentationMiddleware)
+# Route-scoped sampling for the admin profiler; a no-op unless a session targets a route
+app.add_middleware(ProfilingMiddleware)
+# Per-user / per-IP token buckets; over-limit requests get a 429 before any DB work
+app.add_middleware(RateLimitMiddleware)
+# Sheds browsing (then all but checkout) with a 503 while event loop lag or in-flight requests are too high
+app.add_middleware(AdmissionControlMiddleware)
+# Outermost: counts in-flight requests and rejects new ones while draining
+app.add_middleware(InFlightMiddleware)
 
 # Include routers with appropriate prefixes
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(event_manager.router, prefix="/manager", tags=["Event Manager"])
 app.include_router(customer.router, prefix="/customer", tags=["Customer"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,5 +1,5 @@
 # app/models/ticket.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -23,5 +23,18 @@ class Ticket(TicketBase):
 class ReservationRequest(BaseModel):
     seat_numbers: List[str]
     promo_code: Optional[str] = None
+    # Ignored: multipliers are computed server-side by the demand pricing engine
     dynamic_pricing_multiplier: Optional[float] = None
-    cancellation_insurance: bool = False
\ No newline at end of file
+    cancellation_insurance: bool = False
+
+# Bounds on one batch quote, so a single request can't ask for unbounded pricing work
+MAX_QUOTE_OPTIONS = 50
+MAX_SEATS_PER_QUOTE_OPTION = 20
+
+class QuoteOption(BaseModel):
+    seat_numbers: List[str] = Field(max_length=MAX_SEATS_PER_QUOTE_OPTION)
+
+class BatchQuoteRequest(BaseModel):
+    options: List[QuoteOption] = Field(max_length=MAX_QUOTE_OPTIONS)
+    promo_code: Optional[str] = None
+    cancellation_insurance: bool = False
@@ -0,0 +1,28 @@
+# app/routes/admin.py
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import PlainTextResponse
+from app.utils.auth_utils import admin_required
+from app.utils.profiler import profiler
+
+router = APIRouter(dependencies=[Depends(admin_required)])
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10, gt=0, le=300),
+    route: Optional[str] = Query(None, description="Only sample while requests under this path are in flight, e.g. /customer/reserve"),
+    sample_rate: float = Query(1.0, gt=0, le=1),
+    interval_ms: float = Query(5, ge=1, le=1000)
+):
+    """Sample the event loop for `seconds` and return flamegraph-compatible collapsed stacks."""
+    try:
+        profiler.start(route=route, sample_rate=sample_rate, interval=interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        stacks = profiler.stop()
+    return PlainTextResponse(stacks)
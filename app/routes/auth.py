@@ -1,23 +1,23 @@
 # app/routes/auth.py
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request
 from app.models.user import UserCreate, User, Token
-from app.utils.auth_utils import create_access_token
+from app.utils.auth_utils import create_access_token, hash_password, verify_password
 from datetime import timedelta
-from app.database import users_collection
-from passlib.context import CryptContext
+from app.database import collection_dependency
+from app.utils.projections import USER_CREDENTIALS, USER_UNIQUENESS
+from app.utils.login_guard import login_guard
+from app.utils.rate_limit import client_ip
 import uuid
 from pydantic import BaseModel
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
 
 @router.post("/register", response_model=User)
-async def register(user: UserCreate):
+async def register(user: UserCreate, users=Depends(collection_dependency("users"))):
     # Check if username or email already exists
-    existing_user = await users_collection.find_one({"$or": [{"username": user.username}, {"email": user.email}]})
+    existing_user = await users.find_one(
+        {"$or": [{"username": user.username}, {"email": user.email}]}, USER_UNIQUENESS
+    )
     
     if existing_user:
         if existing_user["username"] == user.username:
@@ -28,14 +28,14 @@ async def register(user: UserCreate):
     # If no user exists with the same username/email, proceed with registration
     user_data = user.model_dump()
     user_data["id"] = str(uuid.uuid4())
-    user_data["password"] = get_password_hash(user.password)
+    user_data["password"] = await hash_password(user.password)
 
     # Validate role
     if user.role not in ["customer", "manager"]:
         raise HTTPException(status_code=400, detail="Invalid role. Role must be 'customer' or 'manager'.")
     
     # Insert into MongoDB
-    await users_collection.insert_one(user_data)
+    await users.insert_one(user_data)
     
     return User(**user_data)
 
@@ -44,11 +44,17 @@ class LoginRequest(BaseModel):
     password: str
 
 @router.post("/login", response_model=Token)
-async def login(credentials: LoginRequest):
+async def login(credentials: LoginRequest, request: Request, users=Depends(collection_dependency("users"))):
+    # Usernames and IPs with recent failures back off before any DB or bcrypt work
+    ip = client_ip(request.scope)
+    login_guard.check(credentials.username, ip)
+
     # Fetch user from DB and verify password
-    user = await users_collection.find_one({"username": credentials.username})
-    if not user or not pwd_context.verify(credentials.password, user["password"]):
+    user = await users.find_one({"username": credentials.username}, USER_CREDENTIALS)
+    if not user or not await verify_password(credentials.password, user["password"]):
+        login_guard.record_failure(credentials.username, ip)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    login_guard.record_success(credentials.username)
 
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(data={"sub": credentials.username}, expires_delta=access_token_expires)
@@ -1,16 +1,30 @@
 # app/routes/customer.py
-import asyncio
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
-from app.models.ticket import ReservationRequest, TicketCreate, Ticket
-from app.database import tickets_collection, seats_collection, promos_collection, events_collection
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Response
+from app.models.ticket import ReservationRequest, TicketCreate, Ticket, BatchQuoteRequest
+from app.database import tickets_collection, seats_collection, collection_dependency, SEAT_MAP_FROM_PRIMARY
 from app.utils.auth_utils import get_current_user
-from app.utils.pricing import calculate_total_price
+from app.utils.pricing import calculate_total_price, calculate_batch_prices, get_price_table, event_pricing, ensure_utc, claim_promo_use
+from app.utils.sharded_counters import promo_usage
+from app.utils.cache import get_cached_event, fetch_event
+from app.utils.singleflight import SingleFlight
+from app.utils.demand_pricing import demand_pricing
+from app.utils.inventory import record_seat_transition, bump_inventory_version, get_inventory_version
+from app.utils.analytics import record_booking, record_cancellation
+from app.utils.metrics import reservation_attempts, reservation_failures, seat_conflicts, expiry_lag
 import uuid
+from collections import Counter
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
-from bson import ObjectId
-from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
+from decouple import config
+from app.utils.responses import FastJSONResponse
+from app.utils.idempotency import idempotency
+from app.utils.snapshots import seat_map_snapshots
+from app.utils.write_behind import event_stats
+from app.utils.projections import (
+    SEAT_STATUS, TICKET, TICKET_FIELDS, TICKET_ID, TICKET_SEATS
+)
 
 
 router = APIRouter()
@@ -19,62 +33,82 @@ def customer_required(user=Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Only customers can perform this action")
     return user
 
-def convert_objectid_to_str(document):
-    """Convert ObjectId fields in a MongoDB document to strings."""
-    if isinstance(document, dict):
-        return {k: str(v) if isinstance(v, ObjectId) else v for k, v in document.items()}
-    return document
+async def reservation_seat_types(reservation):
+    """Return seat type -> seat count for a reservation or ticket."""
+    if "seat_types" in reservation:
+        return reservation["seat_types"]
+    # Reservations created before seat types were stored on the document
+    event = await get_cached_event(reservation["event_id"]) or {}
+    seat_types = event.get("seats", {})
+    return dict(Counter(seat_types.get(seat, "Standard") for seat in reservation["seat_numbers"]))
 
 
 @router.post("/reserve")
 async def reserve_ticket(
     event_id: str,
     request: ReservationRequest,
-    background_tasks: BackgroundTasks,
-    user=Depends(customer_required)
+    user=Depends(customer_required),
+    idempotency_key: Optional[str] = Header(None),
+    seats=Depends(collection_dependency("seats")),
+    tickets=Depends(collection_dependency("tickets"))
 ):
+    # Retries carrying the same Idempotency-Key get the original response back
+    return await idempotency.run(
+        user["id"], idempotency_key, "reserve",
+        {"event_id": event_id, "request": request.model_dump()},
+        lambda: create_reservation(event_id, request, user, seats, tickets)
+    )
+
+
+async def create_reservation(event_id: str, request: ReservationRequest, user, seats, tickets):
+    reservation_attempts.inc()
+
     # 1. Check if seats are available
-    available_seats = await seats_collection.find({
+    available_seats = await seats.find({
         "event_id": event_id,
         "seat_number": {"$in": request.seat_numbers},
         "status": "available"
-    }).to_list(length=len(request.seat_numbers))
+    }, SEAT_STATUS).to_list(length=len(request.seat_numbers))
 
     if len(available_seats) != len(request.seat_numbers):
+        reservation_failures.inc(reason="seats_unavailable")
+        seat_conflicts.inc(len(request.seat_numbers) - len(available_seats))
         raise HTTPException(
             status_code=400,
             detail="One or more selected seats are no longer available."
         )
 
-    # 2. Mark seats as reserved
-    for seat in request.seat_numbers:
-        await seats_collection.update_one(
-            {"event_id": event_id, "seat_number": seat},
-            {"$set": {"status": "reserved"}}
-        )
-        
-        # 3. Retrieve event pricing details
-    event = await events_collection.find_one({"id": event_id})
+    # 2. Retrieve event pricing details
+    event = await fetch_event(event_id)
     if not event:
+        reservation_failures.inc(reason="event_not_found")
         raise HTTPException(status_code=404, detail="Event not found")
 
-    event_pricing = {
-        "VIP": event["vip_price"],
-        "Standard": event["standard_price"]
-    }
-
-    # 3. Calculate pricing (including promo discount if applicable)
-    pricing_details = await calculate_total_price(
-        seats=available_seats,
-        event_pricing=event_pricing,
-        dynamic_pricing_multiplier=request.dynamic_pricing_multiplier,
-        promo_code=request.promo_code,
-        cancellation_insurance=request.cancellation_insurance
-    )
+    seat_prices = event_pricing(event)
+    # Priced from demand as it was before this hold, so the customer pays what they were quoted
+    # rather than for their own seats' sell-through
+    dynamic_pricing_multiplier = demand_pricing.multiplier_for_seats(event_id, available_seats, seat_prices)
+
+    # 3. Calculate pricing (including promo discount if applicable).
+    # The multiplier is computed server-side from demand; the client value is ignored.
+    try:
+        pricing_details = await calculate_total_price(
+            seats=available_seats,
+            event_pricing=seat_prices,
+            dynamic_pricing_multiplier=dynamic_pricing_multiplier,
+            promo_code=request.promo_code,
+            cancellation_insurance=request.cancellation_insurance
+        )
+    except ValueError as e:
+        reservation_failures.inc(reason="promo_invalid")
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # 4. Save reservation in MongoDB (a reservation is a Ticket document with status "reserved")
+    # 4. Save the reservation before anything is claimed (a reservation is a Ticket document
+    # with status "reserved"). If this request fails or its worker dies part-way, the expiry
+    # sweeper still finds the document and releases whatever it holds.
     reservation_id = str(uuid.uuid4())
     expiry = datetime.now(timezone.utc) + timedelta(minutes=1)
+    seat_types = dict(Counter(seat["seat_type"] for seat in available_seats))
 
     reservation_data = {
         "id": reservation_id,
@@ -84,36 +118,119 @@ async def reserve_ticket(
         "pricing_details": pricing_details,
         "expiry": expiry,
         "status": "reserved",
-        "cancellation_insurance": request.cancellation_insurance
+        "cancellation_insurance": request.cancellation_insurance,
+        # Nothing is held yet; filled in once the seats and promo use are claimed
+        "seat_types": {},
+        "promo_slot": None
     }
 
-    await tickets_collection.insert_one(reservation_data)
+    await tickets.insert_one(reservation_data)
 
-    # 5. Schedule a background task to expire the reservation if not confirmed in 1 minute
-    background_tasks.add_task(expire_reservation, reservation_id)
+    held_types = {}
+    promo_slot = None
+    try:
+        # 5. Mark seats as reserved. The hold is claimed atomically on the seat documents,
+        # so concurrent requests on any worker can never both get the same seat.
+        claimed = await seats.update_many(
+            {"event_id": event_id, "seat_number": {"$in": request.seat_numbers}, "status": "available"},
+            {"$set": {"status": "reserved", "hold_id": reservation_id}}
+        )
+        if claimed.modified_count != len(request.seat_numbers):
+            reservation_failures.inc(reason="seats_unavailable")
+            seat_conflicts.inc(len(request.seat_numbers) - claimed.modified_count)
+            raise HTTPException(
+                status_code=400,
+                detail="One or more selected seats are no longer available."
+            )
+        await record_seat_transition(event_id, seat_types, "available", "reserved")
+        held_types = seat_types
+
+        # 6. Take the promo use now, while the seats are held, so max_usage holds exactly
+        if request.promo_code:
+            promo_slot = await claim_promo_use(request.promo_code)
+            if promo_slot is None:
+                reservation_failures.inc(reason="promo_exhausted")
+                raise HTTPException(status_code=400, detail="Promo code is no longer active.")
+
+        await tickets.update_one(
+            {"id": reservation_id},
+            {"$set": {"seat_types": seat_types, "promo_slot": promo_slot}}
+        )
+    except BaseException:
+        # Includes cancellation: nothing claimed above may outlive the request
+        await release_hold(seats, event_id, reservation_id, held_types)
+        if promo_slot is not None:
+            await promo_usage.release(request.promo_code, promo_slot)
+        await tickets.delete_one({"id": reservation_id, "status": "reserved"})
+        raise
 
-    return {
+    # 7. Unconfirmed reservations are released by the expiry sweeper after 1 minute
+
+    return FastJSONResponse({
         "reservation_id": reservation_id,
         "pricing_details": pricing_details,
         "reservation_expiry": expiry.isoformat()
-    }
+    })
+
+
+async def release_hold(seats, event_id: str, reservation_id: str, seat_types=None):
+    """Put a reservation's seats back on sale, e.g. when reserving fails part-way."""
+    released = await seats.update_many(
+        {"event_id": event_id, "hold_id": reservation_id, "status": "reserved"},
+        {"$set": {"status": "available"}, "$unset": {"hold_id": ""}}
+    )
+    if seat_types:
+        await record_seat_transition(event_id, seat_types, "reserved", "available")
+    elif released.modified_count:
+        # The seats flickered to reserved and back; seat maps served meanwhile are stale
+        await bump_inventory_version(event_id)
+
+
+async def release_reservation(reservation):
+    """Put the seats a reservation holds back on sale and hand back its promo use."""
+    await seats_collection.update_many(
+        {
+            "event_id": reservation["event_id"],
+            "seat_number": {"$in": reservation["seat_numbers"]},
+            "status": "reserved",
+            # Only this reservation's hold; holds taken before hold_id was stored have none
+            "hold_id": {"$in": [reservation["id"], None]}
+        },
+        {"$set": {"status": "available"}, "$unset": {"hold_id": ""}}
+    )
+    await record_seat_transition(
+        reservation["event_id"], await reservation_seat_types(reservation), "reserved", "available"
+    )
+    await release_promo_use(reservation)
+
+
+async def release_promo_use(reservation):
+    """Hand back the promo use a reservation or ticket took, if any."""
+    if reservation.get("promo_slot") is not None:
+        await promo_usage.release(reservation["pricing_details"]["promo_code"], reservation["promo_slot"])
 
 
 async def expire_reservation(reservation_id: str):
-    """Background task to remove expired reservations."""
-    await asyncio.sleep(60)  # Wait for 60 seconds
-
-    # Query the reservation from the DB
-    reservation = await tickets_collection.find_one({"id": reservation_id})
-    if reservation and reservation["status"] == "reserved":
-        # Release seats back to available
-        for seat in reservation["seat_numbers"]:
-            await seats_collection.update_one(
-                {"event_id": reservation["event_id"], "seat_number": seat},
-                {"$set": {"status": "available"}}
-            )
-        # Remove the expired reservation
-        await tickets_collection.delete_one({"id": reservation_id})
+    """Release the seats of a reservation that was not confirmed in time."""
+    # Deleting the reservation claims it; a concurrent confirm will find nothing
+    reservation = await tickets_collection.find_one_and_delete(
+        {"id": reservation_id, "status": "reserved"}, projection=TICKET_SEATS
+    )
+    if reservation:
+        await release_reservation(reservation)
+        expiry_lag.observe((datetime.now(timezone.utc) - ensure_utc(reservation["expiry"])).total_seconds())
+
+
+RESERVATION_SWEEP_SECONDS = config("RESERVATION_SWEEP_SECONDS", default=5, cast=float)
+
+async def sweep_expired_reservations():
+    """Expire every reservation past its expiry; run by the elected leader only."""
+    expired = await tickets_collection.find(
+        {"status": "reserved", "expiry": {"$lt": datetime.now(timezone.utc)}},
+        TICKET_ID
+    ).to_list(length=None)
+    for reservation in expired:
+        await expire_reservation(reservation["id"])
 
 
 class ConfirmTicketRequest(BaseModel):
@@ -123,97 +240,118 @@ class ConfirmTicketRequest(BaseModel):
 
 
 @router.post("/confirm")
-async def confirm_ticket(request: ConfirmTicketRequest, user=Depends(customer_required)):
-    # Retrieve the reservation that belongs to the customer
-    reservation = await tickets_collection.find_one({"id": request.reservation_id, "user_id": user["id"]})
-    if not reservation:
-        raise HTTPException(
-            status_code=400,
-            detail="Reservation expired or does not exist. Please restart your booking."
-        )
+async def confirm_ticket(
+    request: ConfirmTicketRequest,
+    user=Depends(customer_required),
+    idempotency_key: Optional[str] = Header(None),
+    seats=Depends(collection_dependency("seats")),
+    tickets=Depends(collection_dependency("tickets"))
+):
+    return await idempotency.run(
+        user["id"], idempotency_key, "confirm", request.model_dump(),
+        lambda: complete_reservation(request, user, seats, tickets)
+    )
+
+
+async def complete_reservation(request: ConfirmTicketRequest, user, seats, tickets):
+    # The reservation that belongs to the customer is claimed atomically (deleted if
+    # unpaid, marked booked if paid), so it cannot race with the expiry sweeper
+    reservation_filter = {"id": request.reservation_id, "user_id": user["id"], "status": "reserved"}
+    expired_detail = "Reservation expired or does not exist. Please restart your booking."
 
     # If payment not completed, release seats and remove the reservation
     if request.payment_status.lower() != "payment done":
-        for seat in reservation["seat_numbers"]:
-            await seats_collection.update_one(
-                {"event_id": reservation["event_id"], "seat_number": seat},
-                {"$set": {"status": "available"}}
-            )
-        await tickets_collection.delete_one({"id": request.reservation_id})
+        reservation = await tickets.find_one_and_delete(reservation_filter, projection=TICKET_SEATS)
+        if not reservation:
+            raise HTTPException(status_code=400, detail=expired_detail)
+        await release_reservation(reservation)
         raise HTTPException(
             status_code=400,
             detail="Payment not completed. Reservation cancelled."
         )
 
-    # Payment successful: mark seats as booked
-    for seat in reservation["seat_numbers"]:
-        await seats_collection.update_one(
-            {"event_id": reservation["event_id"], "seat_number": seat},
-            {"$set": {"status": "booked"}}
-        )
-
-    # If a promo code was applied, check if it is active and increment its usage
-    if (promo_code := reservation["pricing_details"].get("promo_code")):
-        promo = await promos_collection.find_one({"code": promo_code})
-        if promo and promo.get("active", False):
-            await promos_collection.update_one(
-                {"code": promo_code},
-                {"$inc": {"current_usage": 1}}
-            )
-
     # Update the reservation to a confirmed booking
     update_fields = {
         "status": "booked",
         "reserved_at": datetime.now(timezone.utc)
     }
-    await tickets_collection.update_one({"id": request.reservation_id}, {"$set": update_fields})
+    # A field list keeps _id, which mongomock needs to return the updated document
+    reservation = await tickets.find_one_and_update(
+        reservation_filter, {"$set": update_fields}, projection=list(TICKET_FIELDS),
+        return_document=ReturnDocument.AFTER
+    )
+    if not reservation:
+        raise HTTPException(status_code=400, detail=expired_detail)
+    reservation.pop("_id")
+
+    # Payment successful: mark seats as booked
+    await seats.update_many(
+        {"event_id": reservation["event_id"], "seat_number": {"$in": reservation["seat_numbers"]}},
+        {"$set": {"status": "booked"}, "$unset": {"hold_id": ""}}
+    )
+    await record_seat_transition(
+        reservation["event_id"], await reservation_seat_types(reservation), "reserved", "booked"
+    )
+
+    # Any promo use was already taken from the promo's quota when reserving
+
+    await record_booking(reservation)
 
-    ticket_data = await tickets_collection.find_one({"id": request.reservation_id})
-    # Convert ObjectId to string before returning
-    if ticket_data and "_id" in ticket_data:
-        ticket_data["_id"] = str(ticket_data["_id"])
-    return {"message": "Ticket booked successfully.", "ticket": jsonable_encoder(ticket_data)}
+    return FastJSONResponse({"message": "Ticket booked successfully.", "ticket": reservation})
 
 
 class CancelRequest(BaseModel):
     ticket_id: str
 
 @router.post("/cancel")
-async def cancel_ticket(request: CancelRequest, user=Depends(customer_required)):
+async def cancel_ticket(
+    request: CancelRequest,
+    user=Depends(customer_required),
+    seats=Depends(collection_dependency("seats")),
+    tickets=Depends(collection_dependency("tickets")),
+    promos=Depends(collection_dependency("promos"))
+):
     ticket_id = request.ticket_id
 
-    # Retrieve ticket ensuring it belongs to the customer and is confirmed (booked)
-    ticket = await tickets_collection.find_one({"id": ticket_id, "user_id": user["id"]})
-
+    # Mark the ticket as cancelled, claiming it atomically: of two concurrent cancels only
+    # one gets the ticket back, so the seats, counters, refund and promo use are released once
+    ticket = await tickets.find_one_and_update(
+        {"id": ticket_id, "user_id": user["id"], "status": "booked"},
+        {"$set": {"status": "cancelled"}},
+        projection=list(TICKET_FIELDS)
+    )
     if not ticket:
+        if await tickets.find_one({"id": ticket_id, "user_id": user["id"]}, TICKET_ID):
+            raise HTTPException(status_code=400, detail="Only confirmed tickets can be cancelled.")
         raise HTTPException(status_code=404, detail="Ticket not found")
-    
-    if ticket["status"] != "booked":
-        raise HTTPException(status_code=400, detail="Only confirmed tickets can be cancelled.")
+    ticket.pop("_id")
 
     # Release each seat back to available
     for seat in ticket["seat_numbers"]:
-        await seats_collection.update_one(
+        await seats.update_one(
             {"event_id": ticket["event_id"], "seat_number": seat},
             {"$set": {"status": "available"}}
         )
+    await record_seat_transition(ticket["event_id"], await reservation_seat_types(ticket), "booked", "available")
 
     # Calculate cancellation fee and refund
     cancellation_fee = 0 if ticket.get("cancellation_insurance", False) else ticket["pricing_details"]["total_cost"] * 0.15
     refund = ticket["pricing_details"]["total_cost"] - cancellation_fee
 
-    # Mark the ticket as cancelled
-    await tickets_collection.update_one({"id": ticket_id}, {"$set": {"status": "cancelled"}})
+    await record_cancellation(ticket, refund, cancellation_fee)
 
-    # Decrement promo usage if a promo code was applied
-    if "promo_code" in ticket["pricing_details"]:
-        await promos_collection.update_one(
+    # Give the promo use back if a promo code was applied
+    if ticket.get("promo_slot") is not None:
+        await release_promo_use(ticket)
+    elif ticket["pricing_details"].get("promo_code"):
+        # Tickets booked before promo usage was sharded counted on the promo document
+        await promos.update_one(
             {"code": ticket["pricing_details"]["promo_code"]},
             {"$inc": {"current_usage": -1}}
         )
 
     # Ensure any reserved record is removed
-    await tickets_collection.delete_many({"id": ticket_id, "status": "reserved"})
+    await tickets.delete_many({"id": ticket_id, "status": "reserved"})
 
     return {
         "status": "cancelled",
@@ -222,23 +360,137 @@ async def cancel_ticket(request: CancelRequest, user=Depends(customer_required))
     }
 
 @router.get("/history/{event_id}")
-async def booking_history(event_id: str, user=Depends(customer_required)):
+async def booking_history(
+    event_id: str,
+    user=Depends(customer_required),
+    tickets=Depends(collection_dependency("tickets"))
+):
     # Retrieve all tickets for the customer for the specified event
-    history = await tickets_collection.find(
-        {"event_id": event_id, "user_id": user["id"]}
+    history = await tickets.find(
+        {"event_id": event_id, "user_id": user["id"]},
+        TICKET
     ).to_list(length=100)
-
-    # Convert ObjectId fields to string before returning
-    return [convert_objectid_to_str(ticket) for ticket in history]
+    return FastJSONResponse(history)
 
 @router.get("/event-seats/{event_id}")
-async def get_event_seats(event_id: str, user=Depends(get_current_user)):
+async def get_event_seats(
+    event_id: str,
+    user=Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    seats=Depends(collection_dependency("seats")),
+    seat_map=Depends(collection_dependency("seat_map"))
+):
+    # The inventory version changes with every seat transition, so an unchanged
+    # seat map is answered with a 304 before any seat is read
+    version = await get_inventory_version(event_id)
+    if version is None:
+        return FastJSONResponse([])
+    event_stats.add({"event_id": event_id}, {"seat_map_views": 1})
+    if not SEAT_MAP_FROM_PRIMARY:
+        # A secondary may not have caught up with `version` yet, so what it returns
+        # can be neither tagged with it nor cached under it
+        return FastJSONResponse(await seat_map_reads.do(event_id, lambda: read_seat_map(seat_map, event_id)))
+
+    etag = f'W/"{version}"'
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # Everyone polling the same version shares one encoded (and pre-compressed) body,
+    # and concurrent misses share the query that builds it
+    snapshot = seat_map_snapshots.get(event_id, version)
+    if snapshot is None:
+        snapshot = await seat_map_reads.do((event_id, version), lambda: build_seat_map(seats, event_id, version))
+    return snapshot.response(accept_encoding, {"ETag": etag})
+
+
+seat_map_reads = SingleFlight("seat_maps")
+
+async def read_seat_map(collection, event_id: str):
     # Fetch all seats for the event
-    seats = await seats_collection.find(
-        {"event_id": event_id}
-    ).to_list(length=1000)
-    return [{
-        "seat_number": seat["seat_number"],
-        "seat_type": seat["seat_type"],
-        "status": seat["status"]
-    } for seat in seats]
+    return await collection.find(
+        {"event_id": event_id},
+        SEAT_STATUS
+    ).to_list(length=None)
+
+async def build_seat_map(collection, event_id: str, version: int):
+    # Read from the primary, which has every transition up to `version`
+    seats = await read_seat_map(collection, event_id)
+    return seat_map_snapshots.set(event_id, version, seats)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored."""
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+@router.post("/quote/batch")
+async def batch_quote(event_id: str, request: BatchQuoteRequest, user=Depends(get_current_user)):
+    """Price several candidate seat selections for an event in one call."""
+    event = await get_cached_event(event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    price_table = get_price_table(event)
+    selections = [option.seat_numbers for option in request.options]
+    seat_types = event.get("seats", {})
+
+    unknown_seats = {seat for selection in selections for seat in selection} - price_table.keys()
+    if unknown_seats:
+        raise HTTPException(status_code=400, detail=f"Unknown seats: {', '.join(sorted(unknown_seats))}")
+
+    seat_prices = event_pricing(event)
+
+    try:
+        quotes = await calculate_batch_prices(
+            selections=selections,
+            price_table=price_table,
+            multipliers=[
+                demand_pricing.multiplier_for_seats(
+                    event_id, [{"seat_type": seat_types[seat]} for seat in selection], seat_prices
+                )
+                for selection in selections
+            ],
+            promo_code=request.promo_code,
+            cancellation_insurance=request.cancellation_insurance,
+            read_only=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    event_stats.add({"event_id": event_id}, {"quotes": len(quotes)})
+    return FastJSONResponse({"event_id": event_id, "quotes": quotes})
+
+@router.post("/quote")
+async def quote_ticket(event_id: str, request: ReservationRequest, user=Depends(get_current_user)):
+    """Price a seat selection without reserving anything."""
+    event = await get_cached_event(event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    # Seat types come from the event document, so quotes never read the seats collection
+    seat_types = event.get("seats", {})
+    unknown_seats = [seat for seat in request.seat_numbers if seat not in seat_types]
+    if unknown_seats:
+        raise HTTPException(status_code=400, detail=f"Unknown seats: {', '.join(unknown_seats)}")
+
+    seat_prices = event_pricing(event)
+    seats = [{"seat_number": seat, "seat_type": seat_types[seat]} for seat in request.seat_numbers]
+
+    try:
+        pricing_details = await calculate_total_price(
+            seats=seats,
+            event_pricing=seat_prices,
+            dynamic_pricing_multiplier=demand_pricing.multiplier_for_seats(event_id, seats, seat_prices),
+            promo_code=request.promo_code,
+            cancellation_insurance=request.cancellation_insurance,
+            read_only=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    event_stats.add({"event_id": event_id}, {"quotes": 1})
+    return FastJSONResponse({"event_id": event_id, "pricing_details": pricing_details})
@@ -1,17 +1,28 @@
 # app/routes/event_manager.py
 from urllib import request
 from fastapi import APIRouter, HTTPException, Depends
+from datetime import datetime
 from app.models.event import EventCreate, Event
 from app.models.promo import PromoCreate, Promo
-from app.database import events_collection, promos_collection, seats_collection
+from app.database import collection_dependency, seat_partitions
 from app.utils.auth_utils import get_current_user
+from app.utils.cache import promo_cache
+from app.utils.sharded_counters import promo_usage
+from app.utils.projections import EXISTS, PROMO, EVENT_STATS
+from app.utils.inventory import init_event_counters, get_event_counters
+from app.utils.analytics import query_rollups
 import uuid
-from typing import Union, List
+from typing import Union, List, Optional, Literal
 
 router = APIRouter()
 
 @router.post("/create-event", response_model=Event)
-async def create_event(event: EventCreate, user=Depends(get_current_user)):
+async def create_event(
+    event: EventCreate,
+    user=Depends(get_current_user),
+    events=Depends(collection_dependency("events")),
+    seats=Depends(collection_dependency("seats"))
+):
     # Ensure only event managers can create events
     if user["role"] != "manager":
         raise HTTPException(status_code=403, detail="Only managers can create events")
@@ -20,7 +31,7 @@ async def create_event(event: EventCreate, user=Depends(get_current_user)):
     event_data["id"] = str(uuid.uuid4())
 
     # Insert event into the events collection
-    await events_collection.insert_one(event_data)
+    await events.insert_one(event_data)
 
     # Insert seats into the seats collection using the new format
     seat_list = []
@@ -32,34 +43,91 @@ async def create_event(event: EventCreate, user=Depends(get_current_user)):
             "event_id": event_data["id"]
         })
 
-    await seats_collection.insert_many(seat_list)
-    
+    # Big on-sales get a seats collection of their own
+    if seat_partitions.should_partition(len(seat_list)):
+        await seat_partitions.add(event_data["id"])
+    await seats.insert_many(seat_list)
+    await init_event_counters(event_data)
+
     return Event(**event_data)
 
 
 @router.post("/create-promo", response_model=Promo)
-async def create_promo(promo: PromoCreate, user=Depends(get_current_user)):
+async def create_promo(
+    promo: PromoCreate,
+    user=Depends(get_current_user),
+    promos=Depends(collection_dependency("promos"))
+):
     """Create a new promo code (only for event managers)."""
     if user["role"] != "manager":
         raise HTTPException(status_code=403, detail="Only managers can create promo codes")
 
-    existing_promo = await promos_collection.find_one({"code": promo.code})
+    existing_promo = await promos.find_one({"code": promo.code}, EXISTS)
     if existing_promo:
         raise HTTPException(status_code=400, detail="Promo code already exists.")
 
     promo_data = promo.model_dump()
     promo_data["id"] = str(uuid.uuid4())
     promo_data["created_by"] = user["id"]  # Store which manager created it
-    await promos_collection.insert_one(promo_data)
+    await promos.insert_one(promo_data)
+    await promo_usage.init(promo.code, promo.max_usage, promo.current_usage)
+    promo_cache.invalidate(promo.code)
 
     return Promo(**promo_data)
 
 
 @router.get("/create-promo", response_model=List[Promo])
-async def get_promos(user=Depends(get_current_user)):
+async def get_promos(user=Depends(get_current_user), promos=Depends(collection_dependency("promos"))):
     """Retrieve all promo codes created by the logged-in manager."""
     if user["role"] != "manager":
         raise HTTPException(status_code=403, detail="Only managers can view promo codes")
 
-    promos = await promos_collection.find({"created_by": user["id"]}).to_list(length=100)
-    return [Promo(**promo) for promo in promos]
\ No newline at end of file
+    created = await promos.find({"created_by": user["id"]}, PROMO).to_list(length=100)
+    # Usage lives in the sharded counters; older promos without them keep their own count
+    usage = await promo_usage.used_many(promo["code"] for promo in created)
+    for promo in created:
+        promo["current_usage"] = usage.get(promo["code"], promo.get("current_usage", 0))
+    return [Promo(**promo) for promo in created]
+
+
+@router.get("/event-stats/{event_id}")
+async def get_event_stats(
+    event_id: str,
+    user=Depends(get_current_user),
+    event_stats=Depends(collection_dependency("event_stats"))
+):
+    """Seat counts per seat type and status for an event, plus its seat-map views and quotes."""
+    if user["role"] != "manager":
+        raise HTTPException(status_code=403, detail="Only managers can view event stats")
+
+    counters = await get_event_counters(event_id)
+    if not counters:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    totals = {}
+    for type_counts in counters.get("counts", {}).values():
+        for status, count in type_counts.items():
+            totals[status] = totals.get(status, 0) + count
+    counters["totals"] = totals
+    # Written behind in bulk, so these lag by up to WRITE_BEHIND_FLUSH_SECONDS
+    counters["activity"] = await event_stats.find_one({"event_id": event_id}, EVENT_STATS) or {}
+    return counters
+
+
+@router.get("/analytics/{event_id}")
+async def get_event_analytics(
+    event_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Literal["total", "hour", "promo"] = "total",
+    user=Depends(get_current_user)
+):
+    """Revenue, discounts, refunds and cancellation fees for an event from hourly rollups."""
+    if user["role"] != "manager":
+        raise HTTPException(status_code=403, detail="Only managers can view analytics")
+
+    return {
+        "event_id": event_id,
+        "group_by": group_by,
+        "results": await query_rollups(event_id, start=start, end=end, group_by=group_by)
+    }
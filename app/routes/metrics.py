@@ -0,0 +1,20 @@
+# app/routes/metrics.py
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.database import collection_dependency
+from app.utils.instrumentation import db_stats_report
+from app.utils.metrics import registry, pending_holds
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse)
+async def prometheus_metrics(tickets=Depends(collection_dependency("tickets"))):
+    """Booking pipeline metrics in the Prometheus text format."""
+    # Holds are taken and released on different workers, so no worker can count them locally
+    pending_holds.set(await tickets.count_documents({"status": "reserved"}))
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/db")
+async def db_metrics():
+    """DB commands, time and documents returned per route since startup."""
+    return db_stats_report()
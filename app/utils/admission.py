@@ -0,0 +1,115 @@
+# app/utils/admission.py
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+from decouple import config
+from app.utils.lifecycle import in_flight
+from app.utils.metrics import event_loop_lag, requests_shed
+
+ADMISSION_CONTROL_ENABLED = config("ADMISSION_CONTROL_ENABLED", default=True, cast=bool)
+LOOP_LAG_SAMPLE_MS = config("LOOP_LAG_SAMPLE_MS", default=50, cast=float)
+# Lag is tracked as a decaying peak: a stall counts at once and fades by this factor per sample
+LOOP_LAG_DECAY = config("LOOP_LAG_DECAY", default=0.8, cast=float)
+# Above these, low-priority requests are shed; above the "normal" ones, everything but critical
+SHED_LOW_LAG_MS = config("SHED_LOW_LAG_MS", default=100, cast=float)
+SHED_NORMAL_LAG_MS = config("SHED_NORMAL_LAG_MS", default=500, cast=float)
+SHED_LOW_IN_FLIGHT = config("SHED_LOW_IN_FLIGHT", default=200, cast=int)
+SHED_NORMAL_IN_FLIGHT = config("SHED_NORMAL_IN_FLIGHT", default=500, cast=int)
+SHED_RETRY_AFTER_SECONDS = config("SHED_RETRY_AFTER_SECONDS", default=2, cast=int)
+
+LOW, NORMAL, CRITICAL = "low", "normal", "critical"
+
+@dataclass(frozen=True)
+class PriorityRule:
+    method: str
+    path_prefix: str
+    priority: str
+
+# First match wins; anything not listed is "normal"
+PRIORITIES: List[PriorityRule] = [
+    # Checkout must keep flowing: these seats are already held and paid for
+    PriorityRule("POST", "/customer/confirm", CRITICAL),
+    # Operators need these most when the service is struggling
+    PriorityRule("*", "/metrics", CRITICAL),
+    PriorityRule("*", "/admin", CRITICAL),
+    # Browsing: safe to retry a moment later
+    PriorityRule("GET", "/customer/event-seats", LOW),
+    PriorityRule("GET", "/customer/history", LOW),
+    PriorityRule("POST", "/customer/quote", LOW),
+    PriorityRule("GET", "/manager/analytics", LOW),
+    PriorityRule("GET", "/manager/event-stats", LOW),
+]
+
+def request_priority(method: str, path: str) -> str:
+    for rule in PRIORITIES:
+        if (rule.method == "*" or rule.method == method) and path.startswith(rule.path_prefix):
+            return rule.priority
+    return NORMAL
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a short sleep."""
+
+    def __init__(self, interval: float = LOOP_LAG_SAMPLE_MS / 1000):
+        self.interval = interval
+        self.lag = 0.0
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            sample = max(loop.time() - started - self.interval, 0.0)
+            event_loop_lag.observe(sample)
+            self.lag = max(sample, self.lag * LOOP_LAG_DECAY)
+
+loop_lag = LoopLagMonitor()
+
+def shed_reason(priority: str) -> Optional[str]:
+    """Why a request of `priority` should be refused right now, or None to admit it."""
+    if priority == CRITICAL:
+        return None
+    lag_ms = loop_lag.lag * 1000
+    lag_limit, in_flight_limit = (
+        (SHED_LOW_LAG_MS, SHED_LOW_IN_FLIGHT) if priority == LOW else (SHED_NORMAL_LAG_MS, SHED_NORMAL_IN_FLIGHT)
+    )
+    if lag_ms > lag_limit:
+        return "lag"
+    if in_flight.count > in_flight_limit:
+        return "in_flight"
+    return None
+
+class AdmissionControlMiddleware:
+    """
+    Answers 503 with Retry-After for low-priority requests while the worker is overloaded.
+
+    Overload is judged by event loop lag (see LoopLagMonitor) and the number of
+    requests in flight. Browsing is shed first, then everything else, while
+    checkout confirmations are always let through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not ADMISSION_CONTROL_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority = request_priority(scope["method"], scope["path"])
+        reason = shed_reason(priority)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        requests_shed.inc(priority=priority, reason=reason)
+        body = b'{"detail":"Server is busy. Please try again shortly."}'
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(SHED_RETRY_AFTER_SECONDS).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,85 @@
+# app/utils/analytics.py
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from app.database import rollups_collection
+from app.utils.pricing import ensure_utc
+
+ROLLUP_FIELDS = (
+    "bookings",
+    "seats_sold",
+    "revenue",
+    "discounts",
+    "cancellations",
+    "seats_cancelled",
+    "refunds",
+    "cancellation_fees",
+)
+
+def hour_bucket(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+async def _increment(event_id: str, promo_code: Optional[str], increments: Dict[str, float]) -> None:
+    """Add `increments` to the rollup of the current hour for this event and promo."""
+    await rollups_collection.update_one(
+        {"event_id": event_id, "hour": hour_bucket(datetime.now(timezone.utc)), "promo_code": promo_code},
+        {"$inc": increments},
+        upsert=True
+    )
+
+async def record_booking(ticket: Dict[str, Any]) -> None:
+    pricing = ticket["pricing_details"]
+    await _increment(ticket["event_id"], pricing.get("promo_code"), {
+        "bookings": 1,
+        "seats_sold": len(ticket["seat_numbers"]),
+        "revenue": pricing["total_cost"],
+        "discounts": pricing.get("discount_applied", 0),
+    })
+
+async def record_cancellation(ticket: Dict[str, Any], refund: float, cancellation_fee: float) -> None:
+    await _increment(ticket["event_id"], ticket["pricing_details"].get("promo_code"), {
+        "cancellations": 1,
+        "seats_cancelled": len(ticket["seat_numbers"]),
+        "refunds": refund,
+        "cancellation_fees": cancellation_fee,
+    })
+
+async def query_rollups(
+    event_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: str = "total"
+) -> List[Dict[str, Any]]:
+    """
+    Sum rollups for an event, grouped by "hour", "promo" or into a single "total".
+
+    Only rollup documents are read, so the cost depends on the number of hours
+    and promos with activity, never on the number of tickets.
+    """
+    match: Dict[str, Any] = {"event_id": event_id}
+    if start or end:
+        match["hour"] = {}
+        # Naive query datetimes are UTC, like the stored hours
+        if start:
+            match["hour"]["$gte"] = hour_bucket(ensure_utc(start))
+        if end:
+            match["hour"]["$lte"] = ensure_utc(end)
+
+    group_key = {"hour": "$hour", "promo": "$promo_code", "total": None}[group_by]
+    group: Dict[str, Any] = {"_id": group_key}
+    for field in ROLLUP_FIELDS:
+        group[field] = {"$sum": f"${field}"}
+
+    results = await rollups_collection.aggregate([
+        {"$match": match},
+        {"$group": group},
+        {"$sort": {"_id": 1}},
+    ]).to_list(length=None)
+
+    for result in results:
+        key = result.pop("_id")
+        if group_by != "total":
+            result[group_by] = key
+        result["net_revenue"] = round(result["revenue"] - result["refunds"], 2)
+        for field in ("revenue", "discounts", "refunds", "cancellation_fees"):
+            result[field] = round(result[field], 2)
+    return results
@@ -1,13 +1,58 @@
 # app/utils/auth_utils.py
+import asyncio
+import hmac
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from decouple import config
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends, Request
 from app.models.user import TokenData  # Pydantic model for token data
 from app.database import users_collection  # Import your user collection
+from app.utils.metrics import bcrypt_queue_depth, bcrypt_duration
+from app.utils.projections import USER_IDENTITY
+from app.utils.singleflight import SingleFlight
+from app.utils.batch_loader import BatchLoader
+from passlib.context import CryptContext
 
 SECRET_KEY = "your-secret-key"  # Load from environment in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+BCRYPT_POOL_SIZE = config("BCRYPT_POOL_SIZE", default=4, cast=int)
+ADMIN_API_KEY = config("ADMIN_API_KEY", default="")  # Admin endpoints are disabled when unset
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt is CPU-bound; keep it off the event loop on a bounded pool
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_POOL_SIZE, thread_name_prefix="bcrypt")
+
+async def _run_bcrypt(operation: str, fn, *args):
+    started = False
+
+    def job():
+        nonlocal started
+        started = True
+        bcrypt_queue_depth.dec()
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            bcrypt_duration.observe(time.perf_counter() - start, operation=operation)
+
+    bcrypt_queue_depth.inc()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, job)
+    except asyncio.CancelledError:
+        if not started:
+            bcrypt_queue_depth.dec()
+        raise
+
+async def hash_password(password: str) -> str:
+    """Hash a password on the bcrypt pool."""
+    return await _run_bcrypt("hash", pwd_context.hash, password)
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    """Check a password against its hash on the bcrypt pool."""
+    return await _run_bcrypt("verify", pwd_context.verify, password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Generate JWT access token."""
@@ -17,9 +62,17 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+async def _find_users(usernames):
+    users = users_collection.find({"username": {"$in": usernames}}, USER_IDENTITY)
+    return {user["username"]: user async for user in users}
+
+user_reads = SingleFlight("users")
+user_loader = BatchLoader("users", _find_users)
+
 async def get_user(username: str):
-    """Fetch user from database by username."""
-    user = await users_collection.find_one({"username": username})
+    """Fetch user from database by username, without the password hash."""
+    # Concurrent requests share lookups: one query per username in flight, one $in per batch window
+    user = await user_reads.do(username, lambda: user_loader.load(username))
     return user
 
 async def get_current_user(request: Request):
@@ -61,3 +114,10 @@ async def get_current_user(request: Request):
         )
 
     return user
+
+
+def admin_required(request: Request):
+    """Allow the request only if it carries the configured admin API key."""
+    api_key = request.headers.get("X-Admin-Key")
+    if not ADMIN_API_KEY or not api_key or not hmac.compare_digest(api_key, ADMIN_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
@@ -0,0 +1,66 @@
+# app/utils/batch_loader.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+from decouple import config
+from app.utils.metrics import batch_loader_size
+
+BATCH_LOADER_WINDOW_MS = config("BATCH_LOADER_WINDOW_MS", default=1, cast=float)
+BATCH_LOADER_MAX_BATCH = config("BATCH_LOADER_MAX_BATCH", default=200, cast=int)
+
+FetchMany = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+class BatchLoader:
+    """
+    Collects single-key lookups from concurrent requests and resolves them together.
+
+    Keys requested within `window` seconds of the first one are fetched with a
+    single `fetch_many(keys)` call, typically one `$in` query, and each caller
+    gets its own value (None if not found). A batch is sent early once it
+    reaches `max_batch` keys.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch_many: FetchMany,
+        window: float = BATCH_LOADER_WINDOW_MS / 1000,
+        max_batch: int = BATCH_LOADER_MAX_BATCH
+    ):
+        self.name = name
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def load(self, key: Hashable) -> Any:
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._dispatch)
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.ensure_future(self._resolve(batch))
+
+    async def _resolve(self, batch: Dict[Hashable, "asyncio.Future[Any]"]) -> None:
+        batch_loader_size.observe(len(batch), name=self.name)
+        try:
+            values = await self.fetch_many(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values.get(key))
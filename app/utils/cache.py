@@ -0,0 +1,117 @@
+# app/utils/cache.py
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from decouple import config
+from app.utils.metrics import cache_requests
+from app.utils.projections import EVENT_PRICING, PROMO
+from app.utils.singleflight import SingleFlight
+from app.utils.batch_loader import BatchLoader
+
+CACHE_TTL_SECONDS = config("CACHE_TTL_SECONDS", default=30, cast=float)
+CACHE_MAX_ENTRIES = config("CACHE_MAX_ENTRIES", default=10000, cast=int)
+
+_MISSING = object()
+
+class BoundedDict(dict):
+    """A dict holding at most `max_entries` keys; adding one more drops the oldest."""
+
+    def __init__(self, max_entries: int):
+        super().__init__()
+        self.max_entries = max_entries
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        if key not in self and len(self) >= self.max_entries:
+            # Dicts keep insertion order, so the first key is the oldest; callers that
+            # pop and re-insert a key on every use get least-recently-used eviction
+            del self[next(iter(self))]
+        super().__setitem__(key, value)
+
+class TTLCache:
+    """Small in-process cache whose entries expire after a fixed number of seconds."""
+
+    def __init__(self, name: str, ttl: float = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES):
+        self.name = name
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[float, Any]] = BoundedDict(max_entries)
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            cache_requests.inc(cache=self.name, result="miss")
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            cache_requests.inc(cache=self.name, result="miss")
+            return default
+        cache_requests.inc(cache=self.name, result="hit")
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def change_handler(self, key_field: str):
+        """Change stream handler dropping the entry for the changed document."""
+        def handle(change: Dict[str, Any]) -> None:
+            document = change.get("fullDocument") or {}
+            if key_field in document:
+                self.invalidate(document[key_field])
+            else:
+                # Deletes only carry the _id, which isn't the cache key
+                self.clear()
+        return handle
+
+event_cache = TTLCache("events")
+promo_cache = TTLCache("promos")
+
+# The finders import their collections when called: app.database imports this module
+
+async def _find_events(event_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    from app.database import events_collection
+    events = events_collection.find({"id": {"$in": event_ids}}, EVENT_PRICING)
+    return {event["id"]: event async for event in events}
+
+async def _find_promos(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    from app.database import promos_collection
+    promos = promos_collection.find({"code": {"$in": codes}}, PROMO)
+    return {promo["code"]: promo async for promo in promos}
+
+event_reads = SingleFlight("events")
+promo_reads = SingleFlight("promos")
+event_loader = BatchLoader("events", _find_events)
+promo_loader = BatchLoader("promos", _find_promos)
+
+async def fetch_event(event_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Read an event from the database.
+
+    Concurrent reads of the same event share one query, and reads of different
+    events within the batch window share one `$in` query.
+    """
+    return await event_reads.do(event_id, lambda: event_loader.load(event_id))
+
+async def fetch_promo(code: str) -> Optional[Dict[str, Any]]:
+    """Read a promo from the database, coalesced and batched like `fetch_event`."""
+    return await promo_reads.do(code, lambda: promo_loader.load(code))
+
+async def get_cached_event(event_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch an event document, served from the cache when possible."""
+    event = event_cache.get(event_id)
+    if event is _MISSING:
+        event = await fetch_event(event_id)
+        event_cache.set(event_id, event)
+    return event
+
+async def get_cached_promo(code: str) -> Optional[Dict[str, Any]]:
+    """Fetch a promo document, served from the cache when possible."""
+    promo = promo_cache.get(code)
+    if promo is _MISSING:
+        promo = await fetch_promo(code)
+        promo_cache.set(code, promo)
+    return promo
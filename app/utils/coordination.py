@@ -0,0 +1,120 @@
+# app/utils/coordination.py
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+from decouple import config
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+from app.database import leases_collection, get_database
+from app.utils.projections import LEASE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+LEASE_TTL_SECONDS = config("LEASE_TTL_SECONDS", default=15, cast=float)
+
+# Identifies this process across every node sharing the database
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Server error code for $changeStream on a standalone mongod
+_CHANGE_STREAMS_UNSUPPORTED = 40573
+
+async def acquire_lease(name: str, ttl: float = LEASE_TTL_SECONDS) -> bool:
+    """
+    Take or renew the named lease for this worker.
+
+    Returns True while this worker holds it. A lease whose holder stops renewing
+    is free again once it expires, so a crashed leader is replaced within `ttl`.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        lease = await leases_collection.find_one_and_update(
+            {"_id": name, "$or": [{"owner": WORKER_ID}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": WORKER_ID, "expires_at": now + timedelta(seconds=ttl)}},
+            projection=list(LEASE_FIELDS),
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Held by another worker: the filter missed and the upsert collided with it
+        return False
+    return lease is not None and lease.get("owner") == WORKER_ID
+
+async def release_lease(name: str) -> None:
+    await leases_collection.delete_one({"_id": name, "owner": WORKER_ID})
+
+async def run_as_leader(name: str, job: Callable[[], Awaitable[Any]], interval: float) -> None:
+    """
+    Run `job` every `interval` seconds, but only on the worker holding lease `name`.
+
+    Meant to run as a background task on every worker; exactly one of them does
+    the work at a time.
+    """
+    ttl = max(LEASE_TTL_SECONDS, interval * 3)
+    try:
+        while True:
+            try:
+                if await acquire_lease(name, ttl):
+                    await job()
+            except Exception:
+                logger.exception("Leader job %r failed", name)
+            await asyncio.sleep(interval)
+    finally:
+        try:
+            await release_lease(name)
+        except Exception:
+            pass
+
+ChangeHandler = Callable[[Dict[str, Any]], None]
+
+class ChangeStreamInvalidator:
+    """
+    Fans database change events out to in-process caches.
+
+    One change stream per worker covers every registered collection. Handlers
+    receive the change event, with the full document for inserts and updates.
+    Change streams need a replica set; on a standalone server the caches fall
+    back to their TTLs.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[ChangeHandler]] = {}
+
+    def register(self, collection_name: str, handler: ChangeHandler) -> None:
+        self._handlers.setdefault(collection_name, []).append(handler)
+
+    def _dispatch(self, change: Dict[str, Any]) -> None:
+        collection_name = change.get("ns", {}).get("coll")
+        for handler in self._handlers.get(collection_name, ()):
+            try:
+                handler(change)
+            except Exception:
+                logger.exception("Change handler for %r failed", collection_name)
+
+    async def run(self) -> None:
+        """Watch forever, resuming after transient errors; meant to run as a background task."""
+        if not self._handlers:
+            return
+        pipeline = [{"$match": {"ns.coll": {"$in": list(self._handlers)}}}]
+        resume_token = None
+        while True:
+            try:
+                async with get_database().watch(
+                    pipeline, full_document="updateLookup", resume_after=resume_token
+                ) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self._dispatch(change)
+            except OperationFailure as e:
+                if e.code == _CHANGE_STREAMS_UNSUPPORTED:
+                    logger.warning("Change streams need a replica set; caches will rely on TTLs")
+                    return
+                logger.exception("Change stream failed; resuming")
+            except PyMongoError:
+                logger.exception("Change stream failed; resuming")
+            await asyncio.sleep(1)
+
+invalidator = ChangeStreamInvalidator()
@@ -0,0 +1,151 @@
+# app/utils/demand_pricing.py
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from decouple import config
+from app.database import counters_collection, events_collection
+from app.utils.pricing import ensure_utc, DEFAULT_SEAT_PRICE
+from app.utils.projections import EVENT_COUNTS, EVENT_DATE
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL_SECONDS = config("DEMAND_PRICING_REFRESH_SECONDS", default=30, cast=float)
+MIN_MULTIPLIER = config("DEMAND_PRICING_MIN_MULTIPLIER", default=0.9, cast=float)
+MAX_MULTIPLIER = config("DEMAND_PRICING_MAX_MULTIPLIER", default=2.0, cast=float)
+
+# Sell-through adds up to +50% as a seat type sells out
+SELL_THROUGH_WEIGHT = 0.5
+# The last week before the event adds up to +20%
+LAST_MINUTE_DAYS = 7
+LAST_MINUTE_WEIGHT = 0.2
+# Slow sellers far from the event get a small discount
+EARLY_BIRD_DAYS = 30
+EARLY_BIRD_SELL_THROUGH = 0.2
+EARLY_BIRD_MULTIPLIER = 0.9
+
+SEAT_STATUSES = ("available", "reserved", "booked")
+
+def compute_multiplier(counts: Dict[str, int], days_to_event: Optional[float]) -> float:
+    """Derive a price multiplier from seat status counts and days left before the event."""
+    total = sum(counts.get(status, 0) for status in SEAT_STATUSES)
+    if total == 0:
+        return 1.0
+    sell_through = (counts.get("reserved", 0) + counts.get("booked", 0)) / total
+
+    multiplier = 1.0 + SELL_THROUGH_WEIGHT * sell_through ** 2
+    if days_to_event is not None:
+        if days_to_event < LAST_MINUTE_DAYS:
+            multiplier *= 1.0 + LAST_MINUTE_WEIGHT * (LAST_MINUTE_DAYS - max(days_to_event, 0)) / LAST_MINUTE_DAYS
+        elif days_to_event > EARLY_BIRD_DAYS and sell_through < EARLY_BIRD_SELL_THROUGH:
+            multiplier *= EARLY_BIRD_MULTIPLIER
+
+    return round(min(max(multiplier, MIN_MULTIPLIER), MAX_MULTIPLIER), 4)
+
+class DemandPricingEngine:
+    """
+    Keeps per-event seat counts in memory and turns them into price multipliers.
+
+    Counts are adjusted incrementally on every seat transition and re-seeded
+    from the event counters on a schedule, so pricing a reservation never runs
+    an aggregation query.
+    """
+
+    def __init__(self):
+        # event_id -> seat_type -> status -> count
+        self._counts: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._event_dates: Dict[str, datetime] = {}
+        self._multipliers: Dict[str, Dict[str, float]] = {}
+
+    def _recompute(self, event_id: str) -> None:
+        event_date = self._event_dates.get(event_id)
+        days_to_event = None
+        if event_date is not None:
+            days_to_event = (event_date - datetime.now(timezone.utc)).total_seconds() / 86400
+        self._multipliers[event_id] = {
+            seat_type: compute_multiplier(counts, days_to_event)
+            for seat_type, counts in self._counts.get(event_id, {}).items()
+        }
+
+    def register_event(self, event: Dict[str, Any]) -> None:
+        """Seed counts for a freshly created event whose seats are all available."""
+        counts: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(SEAT_STATUSES, 0))
+        for seat_type in event.get("seats", {}).values():
+            counts[seat_type]["available"] += 1
+        self._counts[event["id"]] = dict(counts)
+        self._event_dates[event["id"]] = ensure_utc(event["date"])
+        self._recompute(event["id"])
+
+    def record_transition(self, event_id: str, seat_types: Dict[str, int], from_status: str, to_status: str) -> None:
+        """Move `seat_types` (seat type -> number of seats) from one status to another."""
+        event_counts = self._counts.get(event_id)
+        if event_counts is None:
+            # Unknown until the next refresh picks the event up
+            return
+        for seat_type, count in seat_types.items():
+            counts = event_counts.setdefault(seat_type, dict.fromkeys(SEAT_STATUSES, 0))
+            counts[from_status] = max(counts.get(from_status, 0) - count, 0)
+            counts[to_status] = counts.get(to_status, 0) + count
+        self._recompute(event_id)
+
+    def apply_counts(self, event_id: str, counts: Dict[str, Dict[str, int]]) -> None:
+        """Replace an event's counts, e.g. with a counters document changed by another worker."""
+        if event_id not in self._counts:
+            return
+        self._counts[event_id] = counts
+        self._recompute(event_id)
+
+    def counters_change_handler(self, change: Dict[str, Any]) -> None:
+        document = change.get("fullDocument")
+        if document and "event_id" in document:
+            self.apply_counts(document["event_id"], document.get("counts", {}))
+
+    def get_multiplier(self, event_id: str, seat_type: str) -> float:
+        return self._multipliers.get(event_id, {}).get(seat_type, 1.0)
+
+    def multiplier_for_seats(self, event_id: str, seats: List[Dict[str, Any]], event_pricing: Dict[str, float]) -> float:
+        """Blend per-type multipliers into one multiplier for a seat selection, weighted by base price."""
+        base_price = 0.0
+        adjusted_price = 0.0
+        for seat in seats:
+            seat_type = seat.get("seat_type", "Standard")
+            price = event_pricing.get(seat_type, DEFAULT_SEAT_PRICE)
+            base_price += price
+            adjusted_price += price * self.get_multiplier(event_id, seat_type)
+        if base_price == 0:
+            return 1.0
+        return round(adjusted_price / base_price, 4)
+
+    async def refresh(self) -> None:
+        """Re-seed counts for all upcoming events from their counters documents."""
+        now = datetime.now(timezone.utc)
+        events = await events_collection.find(
+            {"date": {"$gte": now}},
+            EVENT_DATE
+        ).to_list(length=None)
+        event_dates = {event["id"]: ensure_utc(event["date"]) for event in events}
+
+        counts: Dict[str, Dict[str, Dict[str, int]]] = {event_id: {} for event_id in event_dates}
+        async for doc in counters_collection.find(
+            {"event_id": {"$in": list(event_dates)}},
+            EVENT_COUNTS
+        ):
+            counts[doc["event_id"]] = doc.get("counts", {})
+
+        self._counts = counts
+        self._event_dates = event_dates
+        self._multipliers = {}
+        for event_id in counts:
+            self._recompute(event_id)
+
+    async def run(self, interval: float = REFRESH_INTERVAL_SECONDS) -> None:
+        """Refresh forever; meant to run as a background task for the app's lifetime."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Demand pricing refresh failed")
+            await asyncio.sleep(interval)
+
+demand_pricing = DemandPricingEngine()
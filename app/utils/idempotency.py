@@ -0,0 +1,162 @@
+# app/utils/idempotency.py
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from decouple import config
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pymongo.errors import DuplicateKeyError
+from app.database import idempotency_collection
+from app.utils.projections import fields
+from app.utils.responses import FastJSONResponse
+
+# How long a request may hold its key before another attempt can take over,
+# e.g. after the worker running it crashed
+IDEMPOTENCY_LOCK_SECONDS = config("IDEMPOTENCY_LOCK_SECONDS", default=30, cast=float)
+MAX_KEY_LENGTH = 255
+
+STORED_RESPONSE = fields("request_hash", "state", "locked_until", "status_code", "body")
+
+# (request hash, status code, body) of a finished request
+StoredResponse = Tuple[str, int, bytes]
+
+def request_hash(route: str, payload: Any) -> str:
+    """Fingerprint of a request, so a key reused for a different request is caught."""
+    encoded = json.dumps({"route": route, "payload": payload}, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def _replay(stored: StoredResponse, expected_hash: str) -> Response:
+    stored_hash, status_code, body = stored
+    if stored_hash != expected_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request.")
+    return Response(
+        content=body, status_code=status_code, media_type="application/json",
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+class IdempotencyStore:
+    """
+    Runs a handler at most once per (user, Idempotency-Key) and replays its response.
+
+    Responses are stored in the idempotency_keys collection, whose TTL index
+    drops them after IDEMPOTENCY_TTL_SECONDS. A retry of a finished request costs
+    one indexed read. Duplicates arriving on the same worker while the first
+    attempt runs wait for its result; on other workers they get a 409.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, str], "asyncio.Future[StoredResponse]"] = {}
+
+    async def run(
+        self,
+        user_id: str,
+        key: Optional[str],
+        route: str,
+        payload: Any,
+        handler: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        if not key:
+            return await handler()
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long.")
+
+        expected_hash = request_hash(route, payload)
+        flight_key = (user_id, key)
+        in_flight = self._in_flight.get(flight_key)
+        if in_flight is not None:
+            return _replay(await asyncio.shield(in_flight), expected_hash)
+
+        # Registered before the first await, so a duplicate arriving on this worker while
+        # the record is read or written waits for this attempt instead of getting a 409
+        future: "asyncio.Future[StoredResponse]" = asyncio.get_running_loop().create_future()
+        self._in_flight[flight_key] = future
+        try:
+            stored, response = await self._run_once(user_id, key, route, expected_hash, handler)
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e if isinstance(e, Exception) else HTTPException(status_code=503))
+                # Waiters may not exist; don't warn about an unretrieved exception
+                future.exception()
+            raise
+        finally:
+            self._in_flight.pop(flight_key, None)
+        future.set_result(stored)
+        return response if response is not None else _replay(stored, expected_hash)
+
+    async def _run_once(
+        self,
+        user_id: str,
+        key: str,
+        route: str,
+        expected_hash: str,
+        handler: Callable[[], Awaitable[Response]]
+    ) -> Tuple[StoredResponse, Optional[Response]]:
+        """Run the handler unless the key already has a response; returns it and the live response, if any."""
+        record_filter = {"user_id": user_id, "key": key}
+        stored = await idempotency_collection.find_one(record_filter, STORED_RESPONSE)
+        if stored is not None and not await self._take_over(record_filter, stored):
+            return self._stored_response(stored), None
+
+        now = datetime.now(timezone.utc)
+        if stored is None:
+            try:
+                await idempotency_collection.insert_one({
+                    **record_filter,
+                    "route": route,
+                    "request_hash": expected_hash,
+                    "state": "in_progress",
+                    "locked_until": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                    "created_at": now,
+                })
+            except DuplicateKeyError:
+                # Another worker got there first
+                stored = await idempotency_collection.find_one(record_filter, STORED_RESPONSE)
+                return self._stored_response(stored), None
+
+        try:
+            try:
+                response = await handler()
+            except HTTPException as e:
+                response = FastJSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+
+            if response.status_code >= 500:
+                # Let the client retry server errors for real
+                await idempotency_collection.delete_one(record_filter)
+            else:
+                await idempotency_collection.update_one(record_filter, {"$set": {
+                    "request_hash": expected_hash,
+                    "state": "completed",
+                    "status_code": response.status_code,
+                    "body": bytes(response.body),
+                }})
+        except BaseException:
+            await asyncio.shield(idempotency_collection.delete_one(record_filter))
+            raise
+        return (expected_hash, response.status_code, bytes(response.body)), response
+
+    async def _take_over(self, record_filter: Dict[str, str], stored: Dict[str, Any]) -> bool:
+        """Claim a key whose in-progress attempt has outlived its lock."""
+        if stored.get("state") != "in_progress":
+            return False
+        locked_until = stored.get("locked_until")
+        now = datetime.now(timezone.utc)
+        if locked_until is not None and locked_until.replace(tzinfo=timezone.utc) > now:
+            return False
+        result = await idempotency_collection.update_one(
+            {**record_filter, "state": "in_progress", "locked_until": locked_until},
+            {"$set": {"locked_until": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)}}
+        )
+        return result.modified_count == 1
+
+    def _stored_response(self, stored: Optional[Dict[str, Any]]) -> StoredResponse:
+        if stored is None or stored.get("state") != "completed":
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress.",
+                headers={"Retry-After": "1"}
+            )
+        return stored["request_hash"], stored["status_code"], stored["body"]
+
+idempotency = IdempotencyStore()
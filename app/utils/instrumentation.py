@@ -0,0 +1,169 @@
+# app/utils/instrumentation.py
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from decouple import config
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Log every document read issued without a projection (see app/utils/projections.py)
+WARN_UNPROJECTED = config("DB_WARN_UNPROJECTED", default=False, cast=bool)
+
+class RequestStats:
+    """DB commands issued while handling one request."""
+
+    __slots__ = ("commands", "db_time_ms", "docs_returned", "unprojected")
+
+    def __init__(self):
+        self.commands: List[str] = []
+        self.db_time_ms = 0.0
+        self.docs_returned = 0
+        self.unprojected = 0
+
+class RouteStats:
+    """Running totals of DB usage for one route."""
+
+    __slots__ = ("requests", "db_ops", "max_db_ops", "db_time_ms", "docs_returned", "unprojected", "commands")
+
+    def __init__(self):
+        self.requests = 0
+        self.db_ops = 0
+        self.max_db_ops = 0
+        self.db_time_ms = 0.0
+        self.docs_returned = 0
+        self.unprojected = 0
+        self.commands: Dict[str, int] = {}
+
+    def add(self, stats: RequestStats) -> None:
+        ops = len(stats.commands)
+        self.requests += 1
+        self.db_ops += ops
+        self.max_db_ops = max(self.max_db_ops, ops)
+        self.db_time_ms += stats.db_time_ms
+        self.docs_returned += stats.docs_returned
+        self.unprojected += stats.unprojected
+        for command in stats.commands:
+            self.commands[command] = self.commands.get(command, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "db_ops": self.db_ops,
+            "avg_db_ops": round(self.db_ops / self.requests, 2) if self.requests else 0.0,
+            "max_db_ops": self.max_db_ops,
+            "avg_db_time_ms": round(self.db_time_ms / self.requests, 3) if self.requests else 0.0,
+            "docs_returned": self.docs_returned,
+            "unprojected_queries": self.unprojected,
+            "commands": dict(sorted(self.commands.items(), key=lambda item: -item[1])),
+        }
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+route_stats: Dict[str, RouteStats] = {}
+
+def _docs_returned(reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if cursor is not None:
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+    if "value" in reply:  # findAndModify
+        return 1 if reply["value"] is not None else 0
+    return 0
+
+def _is_unprojected(command_name: str, command: Dict[str, Any]) -> bool:
+    """True for a document read that returns whole documents."""
+    if command_name == "find":
+        return not command.get("projection")
+    if command_name == "findAndModify":
+        return not command.get("fields")
+    return False
+
+class DBCommandListener(monitoring.CommandListener):
+    """
+    Attributes every Mongo command to the request that issued it.
+
+    Motor runs commands on executor threads with the caller's context copied,
+    so the current request's stats are visible from these callbacks.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int], Tuple[RequestStats, str]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        stats = current_request_stats.get()
+        unprojected = _is_unprojected(event.command_name, event.command)
+        if unprojected and WARN_UNPROJECTED:
+            logger.warning(
+                "Unprojected %s on %r: %s", event.command_name,
+                event.command.get(event.command_name), event.command.get("filter", event.command.get("query"))
+            )
+        if stats is not None:
+            collection = event.command.get(event.command_name)
+            label = f"{event.command_name} {collection}" if isinstance(collection, str) else event.command_name
+            if unprojected:
+                stats.unprojected += 1
+            self._pending[(event.connection_id, event.request_id)] = (stats, label)
+
+    def _finish(self, event, reply: Optional[Dict[str, Any]]) -> None:
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        stats, label = pending
+        stats.commands.append(label)
+        stats.db_time_ms += event.duration_micros / 1000
+        if reply is not None:
+            stats.docs_returned += _docs_returned(reply)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, event.reply)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, None)
+
+db_command_listener = DBCommandListener()
+
+class DBInstrumentationMiddleware:
+    """
+    ASGI middleware that collects per-request DB stats.
+
+    Adds a Server-Timing header to every response and folds the stats into
+    `route_stats`, keyed by route path template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - start) * 1000
+                route = scope.get("route")
+                route_key = f"{scope['method']} {route.path}" if route is not None else "unmatched"
+                route_stats.setdefault(route_key, RouteStats()).add(stats)
+
+                server_timing = (
+                    f'db;dur={stats.db_time_ms:.2f};desc="{len(stats.commands)} ops", '
+                    f"total;dur={total_ms:.2f}"
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", server_timing.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+
+def db_stats_report() -> Dict[str, Dict[str, Any]]:
+    """Per-route DB usage, routes with the most DB operations per request first."""
+    report = {route: stats.as_dict() for route, stats in route_stats.items()}
+    return dict(sorted(report.items(), key=lambda item: -item[1]["avg_db_ops"]))
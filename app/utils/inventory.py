@@ -0,0 +1,143 @@
+# app/utils/inventory.py
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+from decouple import config
+from pymongo import ReturnDocument
+from app.database import counters_collection, events_collection, seats_collection
+from app.utils.cache import TTLCache, get_cached_event
+from app.utils.snapshots import seat_map_snapshots
+from app.utils.demand_pricing import demand_pricing, SEAT_STATUSES
+from app.utils.coordination import run_as_leader
+from app.utils.projections import EVENT_COUNTERS, EVENT_COUNTERS_VERSION, EVENT_COUNTERS_VERSION_FIELDS, EVENT_ID
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL_SECONDS = config("INVENTORY_RECONCILE_SECONDS", default=300, cast=float)
+# How long a worker trusts its copy of an event's inventory version. Local writes and
+# the change stream update it immediately; the TTL bounds staleness without change streams.
+INVENTORY_VERSION_TTL_SECONDS = config("INVENTORY_VERSION_TTL_SECONDS", default=1, cast=float)
+
+# event_id -> inventory version, bumped on every seat status change
+inventory_versions = TTLCache("inventory_versions", ttl=INVENTORY_VERSION_TTL_SECONDS)
+_UNCACHED = object()
+
+async def init_event_counters(event: Dict[str, Any]) -> None:
+    """Create the counters document for a new event, with every seat available."""
+    counts: Dict[str, Dict[str, int]] = {}
+    for seat_type in event.get("seats", {}).values():
+        type_counts = counts.setdefault(seat_type, dict.fromkeys(SEAT_STATUSES, 0))
+        type_counts["available"] += 1
+
+    await counters_collection.update_one(
+        {"event_id": event["id"]},
+        {"$set": {"counts": counts, "version": 0, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    inventory_versions.set(event["id"], 0)
+    demand_pricing.register_event(event)
+
+async def record_seat_transition(event_id: str, seat_types: Dict[str, int], from_status: str, to_status: str) -> None:
+    """
+    Move seats between statuses in the event's counters.
+
+    `seat_types` maps seat type to the number of seats that moved. This must be
+    called for every seat status change so the counters track the seats collection.
+    It also bumps the event's inventory version.
+    """
+    increments: Dict[str, int] = {}
+    for seat_type, count in seat_types.items():
+        increments[f"counts.{seat_type}.{from_status}"] = -count
+        increments[f"counts.{seat_type}.{to_status}"] = count
+    if not increments:
+        return
+
+    await _bump_version(event_id, increments)
+    demand_pricing.record_transition(event_id, seat_types, from_status, to_status)
+
+async def bump_inventory_version(event_id: str) -> None:
+    """Mark an event's seat map as changed without moving any counts."""
+    await _bump_version(event_id, {})
+
+async def _bump_version(event_id: str, increments: Dict[str, int]) -> None:
+    counters = await counters_collection.find_one_and_update(
+        {"event_id": event_id},
+        {"$inc": {**increments, "version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        projection=list(EVENT_COUNTERS_VERSION_FIELDS),
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    inventory_versions.set(event_id, counters["version"])
+    seat_map_snapshots.invalidate(event_id)
+
+async def get_inventory_version(event_id: str) -> Optional[int]:
+    """The event's inventory version, None for an unknown event; usually a cache hit."""
+    version = inventory_versions.get(event_id, _UNCACHED)
+    if version is _UNCACHED:
+        counters = await counters_collection.find_one({"event_id": event_id}, EVENT_COUNTERS_VERSION)
+        if counters is not None:
+            version = counters.get("version", 0)
+        elif await get_cached_event(event_id):
+            # Events created before counters existed, or past ones reconciliation skips:
+            # count their seats now so they get a counters document like any other
+            await reconcile_counters([event_id])
+            version = 0
+        else:
+            version = None
+        inventory_versions.set(event_id, version)
+    return version
+
+def inventory_version_change_handler(change: Dict[str, Any]) -> None:
+    """Change stream handler picking up version bumps made by other workers."""
+    document = change.get("fullDocument")
+    if document and "event_id" in document:
+        inventory_versions.set(document["event_id"], document.get("version", 0))
+        seat_map_snapshots.invalidate(document["event_id"])
+
+async def get_event_counters(event_id: str) -> Optional[Dict[str, Any]]:
+    return await counters_collection.find_one({"event_id": event_id}, EVENT_COUNTERS)
+
+async def reconcile_counters(event_ids: Optional[Iterable[str]] = None) -> None:
+    """
+    Rebuild counters from the seats collection, the source of truth.
+
+    Without `event_ids`, every upcoming event is reconciled. A transition that
+    lands while the aggregation runs can be lost; the next pass corrects it.
+    """
+    if event_ids is None:
+        events = await events_collection.find(
+            {"date": {"$gte": datetime.now(timezone.utc)}},
+            EVENT_ID
+        ).to_list(length=None)
+        event_ids = [event["id"] for event in events]
+    event_ids = list(event_ids)
+
+    counts: Dict[str, Dict[str, Dict[str, int]]] = {event_id: {} for event_id in event_ids}
+    for collection, partition_event_ids in await seats_collection.partitions(event_ids):
+        async for row in collection.aggregate([
+            {"$match": {"event_id": {"$in": partition_event_ids}}},
+            {"$group": {
+                "_id": {"event_id": "$event_id", "seat_type": "$seat_type", "status": "$status"},
+                "count": {"$sum": 1}
+            }}
+        ]):
+            key = row["_id"]
+            type_counts = counts[key["event_id"]].setdefault(key["seat_type"], dict.fromkeys(SEAT_STATUSES, 0))
+            type_counts[key["status"]] = row["count"]
+
+    now = datetime.now(timezone.utc)
+    for event_id, event_counts in counts.items():
+        await counters_collection.update_one(
+            {"event_id": event_id},
+            {"$set": {"counts": event_counts, "updated_at": now, "reconciled_at": now}},
+            upsert=True
+        )
+
+async def run_reconciliation(interval: float = RECONCILE_INTERVAL_SECONDS) -> None:
+    """
+    Reconcile forever; meant to run as a background task on every worker.
+
+    Only the worker holding the reconciliation lease does the work, so adding
+    workers or nodes doesn't multiply the aggregation load.
+    """
+    await run_as_leader("reconcile-counters", reconcile_counters, interval)
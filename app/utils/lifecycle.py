@@ -0,0 +1,80 @@
+# app/utils/lifecycle.py
+import asyncio
+import logging
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+DRAIN_TIMEOUT_SECONDS = config("DRAIN_TIMEOUT_SECONDS", default=20, cast=float)
+
+class InFlightTracker:
+    """Counts requests in progress so shutdown can wait for them."""
+
+    def __init__(self):
+        self.count = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def started(self) -> None:
+        self.count += 1
+        self._idle.clear()
+
+    def finished(self) -> None:
+        self.count -= 1
+        if self.count <= 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT_SECONDS) -> bool:
+        """Refuse new requests and wait for in-flight ones; returns False on timeout."""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("Shutting down with %d requests still in flight", self.count)
+            return False
+
+in_flight = InFlightTracker()
+
+class InFlightMiddleware:
+    """
+    Tracks in-flight requests and answers 503 once the app is draining.
+
+    A request counts until its response body is complete; background tasks
+    that run afterwards are not waited for.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if in_flight.draining:
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"content-type", b"application/json"), (b"connection", b"close"), (b"retry-after", b"1")],
+            })
+            await send({"type": "http.response.body", "body": b'{"detail":"Server is shutting down"}'})
+            return
+
+        in_flight.started()
+        finished = False
+
+        async def send_and_track(message):
+            nonlocal finished
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not finished:
+                finished = True
+                in_flight.finished()
+
+        try:
+            await self.app(scope, receive, send_and_track)
+        finally:
+            if not finished:
+                finished = True
+                in_flight.finished()
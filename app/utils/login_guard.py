@@ -0,0 +1,89 @@
+# app/utils/login_guard.py
+import time
+from typing import Dict, Optional, Tuple
+from decouple import config
+from fastapi import HTTPException, status
+from app.utils.cache import BoundedDict
+from app.utils.metrics import login_rejections
+
+# Failed attempts allowed before backoff starts, per username and per client IP
+# (IPs get more room since many users can share one behind NAT)
+LOGIN_FREE_ATTEMPTS_PER_USER = config("LOGIN_FREE_ATTEMPTS_PER_USER", default=3, cast=int)
+LOGIN_FREE_ATTEMPTS_PER_IP = config("LOGIN_FREE_ATTEMPTS_PER_IP", default=20, cast=int)
+# Backoff doubles from the base delay with every further failure, up to the lockout
+LOGIN_BACKOFF_BASE_SECONDS = config("LOGIN_BACKOFF_BASE_SECONDS", default=1, cast=float)
+LOGIN_LOCKOUT_SECONDS = config("LOGIN_LOCKOUT_SECONDS", default=900, cast=float)
+# Failures older than this are forgotten
+LOGIN_FAILURE_WINDOW_SECONDS = config("LOGIN_FAILURE_WINDOW_SECONDS", default=900, cast=float)
+LOGIN_GUARD_MAX_ENTRIES = config("LOGIN_GUARD_MAX_ENTRIES", default=100000, cast=int)
+
+class FailureTracker:
+    """Consecutive login failures per key, with an exponential backoff deadline."""
+
+    def __init__(self, free_attempts: int, max_entries: int = LOGIN_GUARD_MAX_ENTRIES):
+        self.free_attempts = free_attempts
+        # key -> (failures, blocked until, last failure), monotonic seconds, oldest failure first
+        self._entries: Dict[str, Tuple[int, float, float]] = BoundedDict(max_entries)
+
+    def retry_after(self, key: str, now: float) -> float:
+        """Seconds until `key` may try again; 0 if it may try now."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        failures, blocked_until, last_failure = entry
+        if now - last_failure > LOGIN_FAILURE_WINDOW_SECONDS:
+            del self._entries[key]
+            return 0.0
+        return max(blocked_until - now, 0.0)
+
+    def record_failure(self, key: str, now: float) -> None:
+        failures, _, last_failure = self._entries.pop(key, (0, 0.0, now))
+        if now - last_failure > LOGIN_FAILURE_WINDOW_SECONDS:
+            failures = 0
+        failures += 1
+        blocked_until = now
+        if failures > self.free_attempts:
+            delay = LOGIN_BACKOFF_BASE_SECONDS * 2 ** (failures - self.free_attempts - 1)
+            blocked_until = now + min(delay, LOGIN_LOCKOUT_SECONDS)
+        self._entries[key] = (failures, blocked_until, now)
+
+    def reset(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+class LoginGuard:
+    """
+    Refuses logins for usernames and IPs with recent failures, before any work.
+
+    A check costs two dict lookups, so guessing attacks are turned away without
+    a user lookup or a bcrypt verification.
+    """
+
+    def __init__(self):
+        self.users = FailureTracker(LOGIN_FREE_ATTEMPTS_PER_USER)
+        self.ips = FailureTracker(LOGIN_FREE_ATTEMPTS_PER_IP)
+
+    def check(self, username: str, ip: Optional[str]) -> None:
+        """Raise a 429 if this username or IP is backing off."""
+        now = time.monotonic()
+        user_wait = self.users.retry_after(username.lower(), now)
+        ip_wait = self.ips.retry_after(ip, now) if ip else 0.0
+        wait = max(user_wait, ip_wait)
+        if wait > 0:
+            login_rejections.inc(reason="user" if user_wait >= ip_wait else "ip")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed login attempts. Please try again later.",
+                headers={"Retry-After": str(int(wait) + 1)}
+            )
+
+    def record_failure(self, username: str, ip: Optional[str]) -> None:
+        now = time.monotonic()
+        self.users.record_failure(username.lower(), now)
+        if ip:
+            self.ips.record_failure(ip, now)
+
+    def record_success(self, username: str) -> None:
+        # The IP keeps its history: one valid account shouldn't launder guesses on others
+        self.users.reset(username.lower())
+
+login_guard = LoginGuard()
@@ -0,0 +1,295 @@
+# app/utils/metrics.py
+import asyncio
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+from decouple import config
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Directory shared by all workers of a deployment; each worker publishes its own file
+MULTIPROC_DIR = config("PROMETHEUS_MULTIPROC_DIR", default="")
+MULTIPROC_FLUSH_SECONDS = config("PROMETHEUS_FLUSH_SECONDS", default=5, cast=float)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+class _Metric:
+    """
+    Base class for metrics.
+
+    Each thread writes to its own shard of values, so updates need no lock;
+    readers sum the shards.
+    """
+
+    kind = ""
+    # Whether other workers merge this metric in multiprocess mode
+    published = True
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards: Dict[int, Dict[LabelValues, List[float]]] = {}
+        registry.register(self)
+
+    def _shard(self) -> Dict[LabelValues, List[float]]:
+        thread_id = threading.get_ident()
+        shard = self._shards.get(thread_id)
+        if shard is None:
+            shard = self._shards[thread_id] = {}
+        return shard
+
+    def _labels(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _new_values(self) -> List[float]:
+        return [0.0]
+
+    def collect(self) -> Dict[LabelValues, List[float]]:
+        """Sum every thread's shard into one value list per label set."""
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in list(self._shards.values()):
+            for labels, values in list(shard.items()):
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        total[i] += value
+        return totals
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._labels(labels)
+        shard = self._shard()
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = self._new_values()
+        values[0] += amount
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._labels(labels)
+        for shard in list(self._shards.values()):
+            shard.pop(key, None)
+        self._shard()[key] = [float(value)]
+
+class ClusterGauge(Gauge):
+    """
+    A gauge describing the whole deployment, e.g. read from the database at scrape time.
+
+    It is never published to other workers, so the worker serving the scrape
+    reports it once instead of every worker adding its own copy.
+    """
+
+    published = False
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets) + (math.inf,)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_values(self) -> List[float]:
+        # One slot per bucket, then sum and count
+        return [0.0] * (len(self.buckets) + 2)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._labels(labels)
+        shard = self._shard()
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = self._new_values()
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                values[i] += 1
+                break
+        values[-2] += value
+        values[-1] += 1
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics[metric.name] = metric
+
+    def snapshot(self, published_only: bool = False) -> Dict[str, Dict[str, List[float]]]:
+        return {
+            name: {json.dumps(labels): values for labels, values in metric.collect().items()}
+            for name, metric in self._metrics.items()
+            if metric.published or not published_only
+        }
+
+    def _merged_snapshot(self) -> Dict[str, Dict[LabelValues, List[float]]]:
+        """This worker's values, plus every other worker's published file in multiprocess mode."""
+        snapshots = [self.snapshot()]
+        if MULTIPROC_DIR:
+            own_file = os.path.join(MULTIPROC_DIR, f"{os.getpid()}.json")
+            stale_before = time.time() - 3 * MULTIPROC_FLUSH_SECONDS
+            for path in glob.glob(os.path.join(MULTIPROC_DIR, "*.json")):
+                if path == own_file:
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshot = json.load(f)
+                    fresh = os.path.getmtime(path) >= stale_before
+                except (OSError, ValueError):
+                    continue
+                if not fresh:
+                    # Gauges of dead workers no longer describe anything live
+                    snapshot = {
+                        name: values for name, values in snapshot.items()
+                        if name in self._metrics and self._metrics[name].kind != "gauge"
+                    }
+                # Deployment-wide gauges are reported by this worker alone, even if an older file has them
+                snapshot = {
+                    name: values for name, values in snapshot.items()
+                    if name not in self._metrics or self._metrics[name].published
+                }
+                snapshots.append(snapshot)
+
+        merged: Dict[str, Dict[LabelValues, List[float]]] = {}
+        for snapshot in snapshots:
+            for name, series in snapshot.items():
+                metric_values = merged.setdefault(name, {})
+                for labels_json, values in series.items():
+                    labels = tuple(json.loads(labels_json))
+                    total = metric_values.get(labels)
+                    if total is None:
+                        metric_values[labels] = list(values)
+                    else:
+                        for i, value in enumerate(values):
+                            total[i] += value
+        return merged
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        merged = self._merged_snapshot()
+        for name, metric in self._metrics.items():
+            # Counter samples end in _total, and HELP/TYPE must name the samples they describe
+            exposed = f"{name}_total" if metric.kind == "counter" else name
+            lines.append(f"# HELP {exposed} {metric.documentation}")
+            lines.append(f"# TYPE {exposed} {metric.kind}")
+            for labels, values in sorted(merged.get(name, {}).items()):
+                if isinstance(metric, Histogram):
+                    cumulative = 0.0
+                    for bound, count in zip(metric.buckets, values):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else repr(bound)
+                        bucket_labels = _format_labels(metric.labelnames, labels, f'le="{le}"')
+                        lines.append(f"{name}_bucket{bucket_labels} {cumulative:g}")
+                    lines.append(f"{name}_sum{_format_labels(metric.labelnames, labels)} {values[-2]:g}")
+                    lines.append(f"{name}_count{_format_labels(metric.labelnames, labels)} {values[-1]:g}")
+                else:
+                    lines.append(f"{exposed}{_format_labels(metric.labelnames, labels)} {values[0]:g}")
+        return "\n".join(lines) + "\n"
+
+    def publish(self) -> None:
+        """Write this worker's snapshot for other workers to merge (multiprocess mode)."""
+        path = os.path.join(MULTIPROC_DIR, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(published_only=True), f)
+        os.replace(tmp_path, path)
+
+    async def run_publisher(self, interval: float = MULTIPROC_FLUSH_SECONDS) -> None:
+        """Publish forever; meant to run as a background task when MULTIPROC_DIR is set."""
+        while True:
+            try:
+                self.publish()
+            except OSError:
+                logger.exception("Publishing metrics failed")
+            await asyncio.sleep(interval)
+
+registry = Registry()
+
+# Booking pipeline
+reservation_attempts = Counter("reservation_attempts", "Reservation requests received")
+reservation_failures = Counter("reservation_failures", "Reservations rejected, by reason", ["reason"])
+seat_conflicts = Counter("seat_contention_conflicts", "Requested seats that were already held by someone else")
+# Counted in the database when /metrics is scraped
+pending_holds = ClusterGauge("pending_holds", "Reservations waiting for payment or expiry")
+expiry_lag = Histogram(
+    "reservation_expiry_lag_seconds", "Delay between a reservation's expiry and its release",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120)
+)
+
+# Password hashing pool
+bcrypt_queue_depth = Gauge("bcrypt_pool_queue_depth", "Password hash jobs waiting for a worker thread")
+bcrypt_duration = Histogram("bcrypt_duration_seconds", "Time spent hashing or verifying a password", ["operation"])
+login_rejections = Counter("login_rejections", "Logins refused during failure backoff, by what was backing off", ["reason"])
+
+# Caches
+cache_requests = Counter("cache_requests", "Cache lookups, by cache and result", ["cache", "result"])
+coalesced_reads = Counter("coalesced_reads", "Reads served by joining an identical in-flight query", ["name"])
+batch_loader_size = Histogram(
+    "batch_loader_batch_size", "Keys resolved by one batched lookup query", ["name"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200)
+)
+
+# Admission control
+event_loop_lag = Histogram(
+    "event_loop_lag_seconds", "How late the event loop woke up from a short sleep",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+requests_shed = Counter("requests_shed", "Requests refused with a 503 under overload, by priority and reason", ["priority", "reason"])
+
+# Write-behind counters
+write_behind_pending = Gauge("write_behind_pending", "Documents with increments waiting to be flushed", ["name"])
+write_behind_flushes = Counter("write_behind_flushes", "Bulk flushes of write-behind counters, by result", ["name", "result"])
+
+# Motor connection pool
+pool_checkout_wait = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+)
+pool_checkout_failures = Counter("mongo_pool_checkout_failures", "Connection checkouts that failed, by reason", ["reason"])
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Feeds Motor connection pool checkout waits into the metrics registry."""
+
+    def connection_checked_out(self, event):
+        if event.duration is not None:
+            pool_checkout_wait.observe(event.duration)
+
+    def connection_check_out_failed(self, event):
+        pool_checkout_failures.inc(reason=event.reason)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_checked_in(self, event): pass
+
+pool_metrics_listener = PoolMetricsListener()
@@ -1,69 +1,208 @@
 # app/utils/pricing.py
 from typing import List, Optional, Dict, Any
 from app.database import promos_collection
+from app.utils.cache import TTLCache, get_cached_promo, fetch_promo, promo_cache
+from app.utils.sharded_counters import promo_usage
 from datetime import datetime, timezone
 
+DEFAULT_SEAT_PRICE = 50.0
+GROUP_DISCOUNT_MIN_SEATS = 4
+GROUP_DISCOUNT_RATE = 0.10
+
 def ensure_utc(dt: datetime) -> datetime:
     if dt.tzinfo is None:
         return dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(timezone.utc)
 
-async def calculate_total_price(
-    seats: List[Dict[str, Any]],
-    event_pricing: Dict[str, float],  # e.g. {'VIP': event.vip_price, 'Standard': event.standard_price}
-    dynamic_pricing_multiplier: Optional[float] = None,
-    promo_code: Optional[str] = None,
-    cancellation_insurance: bool = False
-) -> Dict[str, Any]:
+def event_pricing(event: Dict[str, Any]) -> Dict[str, float]:
+    """Base price per seat type for an event."""
+    return {
+        "VIP": event["vip_price"],
+        "Standard": event["standard_price"]
+    }
+
+def build_price_table(event: Dict[str, Any]) -> Dict[str, float]:
     """
-    Calculate the total price for the selected seats.
+    Precompile the base price of every seat of an event, keyed by seat number.
     """
-    # Base price calculation using event-specific pricing
-    base_price = sum(event_pricing.get(seat.get("seat_type", "Standard"), 50.0) for seat in seats)
-    
-    final_price = base_price
-    discount_applied = 0.0
+    prices = event_pricing(event)
+    return {
+        seat_number: prices.get(seat_type, DEFAULT_SEAT_PRICE)
+        for seat_number, seat_type in event.get("seats", {}).items()
+    }
 
-    # Apply dynamic pricing multiplier if provided
-    if dynamic_pricing_multiplier is not None:
-        final_price *= dynamic_pricing_multiplier
+# event_id -> (event document the table was built from, price table)
+price_tables = TTLCache("price_tables")
 
-    # Apply group discount (10% discount if booking 4 or more seats)
-    if len(seats) >= 4:
-        group_discount = 0.10 * final_price
-        final_price -= group_discount
-        discount_applied += group_discount
+def get_price_table(event: Dict[str, Any]) -> Dict[str, float]:
+    """
+    The precompiled price table of an event, built once per cached event document.
+
+    Tables are tied to the exact document `get_cached_event` returned, so when
+    the event cache drops or refreshes the event the table is rebuilt with it.
+    """
+    entry = price_tables.get(event["id"], None)
+    if entry is not None and entry[0] is event:
+        return entry[1]
+    table = build_price_table(event)
+    price_tables.set(event["id"], (event, table))
+    return table
 
-    # Handle promo code validation and application
-    if promo_code:
-        now = datetime.now(timezone.utc)  # Ensure UTC-aware datetime
-        promo = await promos_collection.find_one({"code": promo_code})
+async def get_active_promo(promo_code: str, read_only: bool = False) -> Dict[str, Any]:
+    """
+    Fetch a promo code and make sure it can still be applied.
+
+    With `read_only` the promo may come from the cache and an expired promo is
+    rejected without being deactivated in the database. The usage check reads
+    a cached total; `claim_promo_use` is what enforces `max_usage` exactly.
+    """
+    now = datetime.now(timezone.utc)  # Ensure UTC-aware datetime
+    if read_only:
+        promo = await get_cached_promo(promo_code)
+    else:
+        promo = await fetch_promo(promo_code)
 
-        if not promo or not promo.get("active", False):
-            raise ValueError("Promo code is no longer active.")
+    if not promo or not promo.get("active", False):
+        raise ValueError("Promo code is no longer active.")
 
-        expiry = promo.get("expiry")
-        if expiry:
-            expiry = ensure_utc(expiry)
+    expiry = promo.get("expiry")
+    if expiry:
+        expiry = ensure_utc(expiry)
 
-        if (expiry and expiry < now) or (promo.get("current_usage", 0) >= promo.get("max_usage", 0)):
+    if expiry and expiry < now:
+        if not read_only:
             await promos_collection.update_one({"code": promo_code}, {"$set": {"active": False}})
-            raise ValueError("Promo code is no longer active.")
+            promo_cache.invalidate(promo_code)
+        raise ValueError("Promo code is no longer active.")
+
+    # Uses held by unpaid reservations come back if they lapse, so an exhausted
+    # promo is refused but not deactivated
+    used = await promo_usage.used(promo_code)
+    if used is None:
+        used = promo.get("current_usage", 0)
+    if used >= promo.get("max_usage", 0):
+        raise ValueError("Promo code is no longer active.")
+
+    return promo
+
+async def claim_promo_use(promo_code: str) -> Optional[int]:
+    """
+    Take one use of a promo's `max_usage` quota.
+
+    Returns the counter slot to hand back with `promo_usage.release` if the
+    booking falls through, or None when the promo is used up.
+    """
+    slot = await promo_usage.claim(promo_code)
+    if slot is None and not await promo_usage.exists(promo_code):
+        # Promos created before usage was sharded get their counters on first use
+        promo = await fetch_promo(promo_code)
+        if promo:
+            await promo_usage.init(promo_code, promo.get("max_usage", 0), promo.get("current_usage", 0))
+            slot = await promo_usage.claim(promo_code)
+    return slot
 
+def price_selections(
+    base_prices: List[float],
+    seat_counts: List[int],
+    multipliers: List[Optional[float]],
+    promo: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, float]]:
+    """
+    Apply multipliers, group discount and promo to many selections at once.
+
+    All arguments are parallel columns, one entry per selection, so every
+    pricing step is a single pass over the whole batch.
+    """
+    final_prices = [
+        base * multiplier if multiplier is not None else base
+        for base, multiplier in zip(base_prices, multipliers)
+    ]
+
+    # Apply group discount (10% discount if booking 4 or more seats)
+    discounts = [
+        GROUP_DISCOUNT_RATE * price if count >= GROUP_DISCOUNT_MIN_SEATS else 0.0
+        for price, count in zip(final_prices, seat_counts)
+    ]
+    final_prices = [price - discount for price, discount in zip(final_prices, discounts)]
+
+    if promo:
         discount_type = promo.get("discount_type", "percentage")
         discount_value = promo.get("discount_value", 0)
+        if discount_type == "percentage":
+            promo_discounts = [(discount_value / 100.0) * price for price in final_prices]
+        else:
+            promo_discounts = [discount_value] * len(final_prices)
+        # Avoid over-discounting
+        promo_discounts = [min(d, price) for d, price in zip(promo_discounts, final_prices)]
+        final_prices = [price - d for price, d in zip(final_prices, promo_discounts)]
+        discounts = [discount + d for discount, d in zip(discounts, promo_discounts)]
 
-        promo_discount = (discount_value / 100.0) * final_price if discount_type == "percentage" else discount_value
-        promo_discount = min(promo_discount, final_price)  # Avoid over-discounting
+    return [
+        {"total_cost": price, "discount_applied": discount}
+        for price, discount in zip(final_prices, discounts)
+    ]
 
-        final_price -= promo_discount
-        discount_applied += promo_discount
+async def calculate_total_price(
+    seats: List[Dict[str, Any]],
+    event_pricing: Dict[str, float],  # e.g. {'VIP': event.vip_price, 'Standard': event.standard_price}
+    dynamic_pricing_multiplier: Optional[float] = None,
+    promo_code: Optional[str] = None,
+    cancellation_insurance: bool = False,
+    read_only: bool = False
+) -> Dict[str, Any]:
+    """
+    Calculate the total price for the selected seats.
+    """
+    # Base price calculation using event-specific pricing
+    base_price = sum(event_pricing.get(seat.get("seat_type", "Standard"), DEFAULT_SEAT_PRICE) for seat in seats)
+
+    # Handle promo code validation before pricing
+    promo = await get_active_promo(promo_code, read_only=read_only) if promo_code else None
+
+    [priced] = price_selections([base_price], [len(seats)], [dynamic_pricing_multiplier], promo)
 
     return {
         "base_price": base_price,
-        "total_cost": round(final_price, 2),
-        "discount_applied": round(discount_applied, 2),
+        "total_cost": round(priced["total_cost"], 2),
+        "discount_applied": round(priced["discount_applied"], 2),
         "promo_code": promo_code,
         "dynamic_pricing_multiplier": dynamic_pricing_multiplier,
         "cancellation_insurance": cancellation_insurance
     }
+
+async def calculate_batch_prices(
+    selections: List[List[str]],
+    price_table: Dict[str, float],
+    multipliers: Optional[List[Optional[float]]] = None,
+    promo_code: Optional[str] = None,
+    cancellation_insurance: bool = False,
+    read_only: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Price many candidate seat selections of one event in a single call.
+
+    `price_table` comes from `get_price_table`; the promo is looked up once
+    for the whole batch. Raises KeyError for a seat the event does not have.
+    """
+    if multipliers is None:
+        multipliers = [None] * len(selections)
+
+    base_prices = [sum(price_table[seat] for seat in selection) for selection in selections]
+    seat_counts = [len(selection) for selection in selections]
+
+    promo = await get_active_promo(promo_code, read_only=read_only) if promo_code else None
+
+    priced = price_selections(base_prices, seat_counts, multipliers, promo)
+
+    return [
+        {
+            "seat_numbers": selection,
+            "base_price": base_price,
+            "total_cost": round(result["total_cost"], 2),
+            "discount_applied": round(result["discount_applied"], 2),
+            "promo_code": promo_code,
+            "dynamic_pricing_multiplier": multiplier,
+            "cancellation_insurance": cancellation_insurance
+        }
+        for selection, base_price, multiplier, result in zip(selections, base_prices, multipliers, priced)
+    ]
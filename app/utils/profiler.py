@@ -0,0 +1,118 @@
+# app/utils/profiler.py
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+
+DEFAULT_INTERVAL_SECONDS = 0.005
+MAX_STACK_DEPTH = 128
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # Keep paths short: package-relative where possible
+    for marker in (f"{os.sep}site-packages{os.sep}", f"{os.sep}app{os.sep}"):
+        index = filename.rfind(marker)
+        if index != -1:
+            filename = filename[index + len(os.sep):]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """
+    Statistical stack sampler for the event loop thread.
+
+    A background thread reads the loop thread's current frame at a fixed
+    interval and counts collapsed stacks, which can be fed straight into
+    flamegraph.pl or speedscope. Nothing runs while no session is active.
+    """
+
+    def __init__(self):
+        self.route: Optional[str] = None
+        self.sample_rate = 1.0
+        self._active_requests = 0
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, route: Optional[str] = None, sample_rate: float = 1.0, interval: float = DEFAULT_INTERVAL_SECONDS) -> None:
+        """
+        Start sampling the calling thread.
+
+        With `route` (a path prefix), samples are only taken while a sampled
+        request to it is in flight; otherwise the whole process is sampled.
+        """
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profiling session is already running")
+            self._stacks = Counter()
+            self._active_requests = 0
+            self.sample_rate = sample_rate
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sample, args=(threading.get_ident(), route is not None, interval),
+                name="sampling-profiler", daemon=True
+            )
+            self.route = route
+            self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks, one `frame;frame;... count` per line."""
+        with self._lock:
+            self.route = None
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+    def _sample(self, thread_id: int, route_only: bool, interval: float) -> None:
+        while not self._stop.wait(interval):
+            if route_only and self._active_requests <= 0:
+                continue
+            frame = sys._current_frames().get(thread_id)
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self._stacks[";".join(reversed(labels))] += 1
+
+    def should_sample(self, path: str) -> bool:
+        return path.startswith(self.route) and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+
+    def request_started(self) -> None:
+        self._active_requests += 1
+
+    def request_finished(self) -> None:
+        self._active_requests -= 1
+
+profiler = SamplingProfiler()
+
+class ProfilingMiddleware:
+    """
+    Marks sampled requests to the profiled route as in flight.
+
+    When no route-scoped session is active this is a single attribute check.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if profiler.route is None or scope["type"] != "http" or not profiler.should_sample(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        profiler.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.request_finished()
@@ -0,0 +1,63 @@
+# app/utils/projections.py
+"""
+Named field projections, one per kind of read.
+
+Every find/find_one/find_one_and_* passes one of these, so each call site
+declares the fields it needs and Mongo never ships (or Python decodes) the
+rest. tests/test_projections.py fails on any call site in app/ without one.
+Queries issued without a projection at runtime are counted per route in
+/metrics/db and can be logged with DB_WARN_UNPROJECTED=true.
+
+The *_FIELDS tuples are for find_one_and_update with ReturnDocument.AFTER: passed
+as a list they keep `_id`, which mongomock needs to return the updated document.
+"""
+from typing import Dict
+
+Projection = Dict[str, int]
+
+def fields(*names: str) -> Projection:
+    """Projection returning only `names`, without `_id`."""
+    projection: Projection = {"_id": 0}
+    projection.update(dict.fromkeys(names, 1))
+    return projection
+
+# Any matching document will do; only its existence matters
+EXISTS: Projection = {"_id": 1}
+
+# Users: the password hash is only read when checking a password
+USER_IDENTITY = fields("id", "username", "email", "role")
+USER_CREDENTIALS = fields("id", "username", "role", "password")
+USER_UNIQUENESS = fields("username", "email")
+
+# Events: pricing and seat-type lookups need everything but the descriptive text
+EVENT_PRICING = fields("id", "date", "vip_price", "standard_price", "seats")
+EVENT_DATE = fields("id", "date")
+EVENT_ID = fields("id")
+EVENT_STATS = fields("seat_map_views", "quotes", "updated_at")
+
+SEAT_STATUS = fields("seat_number", "seat_type", "status")
+# Seat partitions are keyed by event id and hold nothing else worth reading
+SEAT_PARTITION: Projection = {"_id": 1}
+
+EVENT_COUNTERS = fields("event_id", "counts", "version", "updated_at")
+EVENT_COUNTS = fields("event_id", "counts")
+EVENT_COUNTERS_VERSION_FIELDS = ("version",)
+EVENT_COUNTERS_VERSION = fields(*EVENT_COUNTERS_VERSION_FIELDS)
+
+TICKET_FIELDS = (
+    "id", "user_id", "event_id", "seat_numbers", "seat_types", "pricing_details",
+    "expiry", "status", "cancellation_insurance", "reserved_at", "promo_slot",
+)
+TICKET = fields(*TICKET_FIELDS)
+# Seat release needs only where the seats are, when the hold lapsed and the promo use to hand back
+TICKET_SEATS = fields("id", "event_id", "seat_numbers", "seat_types", "expiry", "pricing_details.promo_code", "promo_slot")
+TICKET_ID = fields("id")
+
+PROMO_FIELDS = (
+    "id", "code", "discount_type", "discount_value", "expiry", "max_usage", "current_usage", "active",
+)
+PROMO = fields(*PROMO_FIELDS)
+PROMO_STATUS = fields("code", "active")
+
+LEASE_FIELDS = ("owner",)
+RATE_LIMIT_BUCKET_FIELDS = ("tokens", "allowed")
@@ -0,0 +1,170 @@
+# app/utils/rate_limit.py
+import logging
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from decouple import config
+from jose import JWTError, jwt
+from pymongo import ReturnDocument
+from app.database import rate_limits_collection
+from app.utils.auth_utils import SECRET_KEY, ALGORITHM
+from app.utils.cache import BoundedDict
+from app.utils.projections import RATE_LIMIT_BUCKET_FIELDS
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = config("RATE_LIMIT_ENABLED", default=True, cast=bool)
+# "memory" keeps buckets per worker; "mongo" shares them between all workers
+RATE_LIMIT_BACKEND = config("RATE_LIMIT_BACKEND", default="memory")
+# Use the first X-Forwarded-For address as the client IP (only behind a trusted proxy)
+RATE_LIMIT_TRUST_FORWARDED = config("RATE_LIMIT_TRUST_FORWARDED", default=False, cast=bool)
+RATE_LIMIT_MAX_BUCKETS = config("RATE_LIMIT_MAX_BUCKETS", default=100000, cast=int)
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    method: str
+    path_prefix: str
+    capacity: float  # burst size
+    refill_per_second: float
+
+# First match wins; paths not listed here are not limited
+RULES: List[RateLimitRule] = [
+    RateLimitRule("login", "POST", "/auth/login", capacity=10, refill_per_second=0.5),
+    RateLimitRule("register", "POST", "/auth/register", capacity=5, refill_per_second=0.1),
+    RateLimitRule("reserve", "POST", "/customer/reserve", capacity=10, refill_per_second=1),
+    RateLimitRule("confirm", "POST", "/customer/confirm", capacity=10, refill_per_second=1),
+    RateLimitRule("seat-map", "GET", "/customer/event-seats", capacity=20, refill_per_second=5),
+    RateLimitRule("quote", "POST", "/customer/quote", capacity=30, refill_per_second=10),
+    RateLimitRule("customer", "*", "/customer", capacity=60, refill_per_second=20),
+    RateLimitRule("manager", "*", "/manager", capacity=60, refill_per_second=20),
+]
+
+def match_rule(method: str, path: str) -> Optional[RateLimitRule]:
+    for rule in RULES:
+        if (rule.method == "*" or rule.method == method) and path.startswith(rule.path_prefix):
+            return rule
+    return None
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers") or ():
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def client_key(scope) -> str:
+    """The user from a valid bearer token, else the client IP; never touches the database."""
+    headers = dict(scope.get("headers") or ())
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if authorization.startswith("Bearer "):
+        try:
+            subject = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+    return f"ip:{client_ip(scope)}"
+
+class MemoryBuckets:
+    """Token buckets held by this worker."""
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        # key -> (tokens, last refill, monotonic seconds), least recently used first
+        self._buckets: Dict[str, Tuple[float, float]] = BoundedDict(max_buckets)
+
+    async def take(self, rule: RateLimitRule, key: str) -> float:
+        """Take a token; returns 0 if allowed, else the seconds until one is available."""
+        now = time.monotonic()
+        bucket_key = f"{rule.name}:{key}"
+        tokens, updated = self._buckets.pop(bucket_key, (rule.capacity, now))
+        tokens = min(rule.capacity, tokens + (now - updated) * rule.refill_per_second)
+        if tokens >= 1:
+            self._buckets[bucket_key] = (tokens - 1, now)
+            return 0.0
+        self._buckets[bucket_key] = (tokens, now)
+        return (1 - tokens) / rule.refill_per_second
+
+class MongoBuckets:
+    """
+    Token buckets shared by all workers, one document per bucket.
+
+    Each request is a single pipeline-style find_one_and_update that refills,
+    tests and takes in one atomic step. Documents expire through a TTL index.
+    """
+
+    async def take(self, rule: RateLimitRule, key: str) -> float:
+        now = datetime.now(timezone.utc)
+        refilled = {"$min": [
+            rule.capacity,
+            {"$add": [
+                {"$ifNull": ["$tokens", rule.capacity]},
+                {"$multiply": [
+                    {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]},
+                    rule.refill_per_second
+                ]}
+            ]}
+        ]}
+        try:
+            bucket = await rate_limits_collection.find_one_and_update(
+                {"_id": f"{rule.name}:{key}"},
+                [
+                    {"$set": {"tokens": refilled, "updated_at": now}},
+                    {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                    {"$set": {
+                        "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                        "expires_at": now + timedelta(seconds=rule.capacity / rule.refill_per_second),
+                    }},
+                ],
+                projection=list(RATE_LIMIT_BUCKET_FIELDS),
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception:
+            # Fail open: an unavailable limiter must not take the API down with it
+            logger.warning("Shared rate limit check failed; allowing the request", exc_info=True)
+            return 0.0
+        if bucket["allowed"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / rule.refill_per_second
+
+buckets = MongoBuckets() if RATE_LIMIT_BACKEND == "mongo" else MemoryBuckets()
+
+class RateLimitMiddleware:
+    """
+    Rejects requests over their route's rate with a 429 before any handler runs.
+
+    Requests are keyed by the user in their bearer token (checked locally, no
+    database) or, for anonymous requests, by client IP.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        rule = None
+        if RATE_LIMIT_ENABLED and scope["type"] == "http":
+            rule = match_rule(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await buckets.take(rule, client_key(scope))
+        if retry_after <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        body = b'{"detail":"Too many requests. Please slow down."}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(math.ceil(retry_after), 1)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,40 @@
+# app/utils/responses.py
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+def _default(value: Any) -> Any:
+    """Encode the Mongo and numeric types the JSON libraries don't know."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        # Only reached on the json fallback; orjson encodes these itself
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson, falling back to the standard library.
+
+    It is the app's default response class. Handlers on hot paths return it
+    directly, with Mongo documents read under a `{"_id": 0}` projection, which
+    skips FastAPI's jsonable_encoder walk entirely.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
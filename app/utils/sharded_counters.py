@@ -0,0 +1,114 @@
+# app/utils/sharded_counters.py
+import random
+from typing import Any, Dict, Iterable, List, Optional
+from decouple import config
+from pymongo.errors import BulkWriteError
+from app.database import promo_usage_collection
+from app.utils.cache import TTLCache
+from app.utils.projections import EXISTS, fields
+
+PROMO_COUNTER_SLOTS = config("PROMO_COUNTER_SLOTS", default=8, cast=int)
+# How long a worker trusts an aggregated total; claims always check the slots themselves
+SHARDED_COUNTER_TTL_SECONDS = config("SHARDED_COUNTER_TTL_SECONDS", default=1, cast=float)
+
+class ShardedQuota:
+    """
+    A usage count with a hard limit, spread over several slot documents.
+
+    The limit is split into per-slot quotas when the counter is created. A
+    claim takes one unit from a random slot that has some left, in a single
+    conditional `$inc`, so concurrent claims contend on N documents instead of
+    one and the limit is never exceeded. A release hands the unit back to the
+    slot it came from. Totals are aggregated over the slots and cached briefly.
+    """
+
+    def __init__(self, name: str, collection, slots: int):
+        self.name = name
+        self.collection = collection
+        self.slots = max(slots, 1)
+        self.totals = TTLCache(name, ttl=SHARDED_COUNTER_TTL_SECONDS)
+
+    @staticmethod
+    def _slot_id(key: str, slot: int) -> str:
+        return f"{key}:{slot}"
+
+    async def init(self, key: str, limit: int, used: int = 0) -> None:
+        """Create the slots for `key`, unless they exist already."""
+        quotas = [limit // self.slots + (1 if slot < limit % self.slots else 0) for slot in range(self.slots)]
+        documents = []
+        for slot, quota in enumerate(quotas):
+            taken = min(quota, max(used, 0))
+            used -= taken
+            documents.append({
+                "_id": self._slot_id(key, slot), "key": key, "slot": slot,
+                "quota": quota, "remaining": quota - taken,
+            })
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Another worker created them first
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+        self.totals.invalidate(key)
+
+    async def exists(self, key: str) -> bool:
+        return await self.collection.find_one({"key": key}, EXISTS) is not None
+
+    async def claim(self, key: str) -> Optional[int]:
+        """Take one unit; returns the slot it came from, or None if the limit is reached."""
+        slot = random.randrange(self.slots)
+        if await self._take(key, slot):
+            return slot
+        # That slot ran dry; try the ones that still have quota, in random order
+        spare = await self.collection.find(
+            {"key": key, "remaining": {"$gt": 0}}, fields("slot")
+        ).to_list(length=None)
+        random.shuffle(spare)
+        for document in spare:
+            if await self._take(key, document["slot"]):
+                return document["slot"]
+        return None
+
+    async def _take(self, key: str, slot: int) -> bool:
+        result = await self.collection.update_one(
+            {"_id": self._slot_id(key, slot), "remaining": {"$gt": 0}},
+            {"$inc": {"remaining": -1}}
+        )
+        if result.modified_count:
+            self.totals.invalidate(key)
+            return True
+        return False
+
+    async def release(self, key: str, slot: int) -> None:
+        """Give back a unit taken by `claim`; a slot never holds more than its quota."""
+        await self.collection.update_one(
+            {"_id": self._slot_id(key, slot), "$expr": {"$lt": ["$remaining", "$quota"]}},
+            {"$inc": {"remaining": 1}}
+        )
+        self.totals.invalidate(key)
+
+    async def used(self, key: str) -> Optional[int]:
+        """Units currently taken, or None if `key` has no counter."""
+        return (await self.used_many([key])).get(key)
+
+    async def used_many(self, keys: Iterable[str]) -> Dict[str, int]:
+        """Units taken per key, aggregated in one query for the keys not cached."""
+        result: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key in keys:
+            used = self.totals.get(key, None)
+            if used is None:
+                missing.append(key)
+            else:
+                result[key] = used
+        if missing:
+            totals = self.collection.aggregate([
+                {"$match": {"key": {"$in": missing}}},
+                {"$group": {"_id": "$key", "used": {"$sum": {"$subtract": ["$quota", "$remaining"]}}}},
+            ])
+            async for total in totals:
+                result[total["_id"]] = total["used"]
+                self.totals.set(total["_id"], total["used"])
+        return result
+
+promo_usage = ShardedQuota("promo_usage", promo_usage_collection, PROMO_COUNTER_SLOTS)
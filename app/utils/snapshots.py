@@ -0,0 +1,91 @@
+# app/utils/snapshots.py
+import gzip
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+from decouple import config
+from fastapi.responses import Response
+from app.utils.cache import BoundedDict
+from app.utils.metrics import cache_requests
+from app.utils.responses import dumps
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+SNAPSHOT_MAX_ENTRIES = config("SNAPSHOT_MAX_ENTRIES", default=1000, cast=int)
+# Bodies smaller than this aren't worth compressing
+SNAPSHOT_COMPRESS_MIN_BYTES = config("SNAPSHOT_COMPRESS_MIN_BYTES", default=1024, cast=int)
+SNAPSHOT_GZIP_LEVEL = config("SNAPSHOT_GZIP_LEVEL", default=6, cast=int)
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Set[str]:
+    """Content-codings an Accept-Encoding header allows, ignoring those with q=0."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0 and coding.strip():
+            accepted.add(coding.strip().lower())
+    return accepted
+
+class Snapshot:
+    """An encoded response body, with pre-compressed variants when it is big enough."""
+
+    __slots__ = ("body", "encodings")
+
+    def __init__(self, content: Any):
+        self.body = dumps(content)
+        # content-coding -> compressed body
+        self.encodings: Dict[str, bytes] = {}
+        if len(self.body) >= SNAPSHOT_COMPRESS_MIN_BYTES:
+            if brotli is not None:
+                self.encodings["br"] = brotli.compress(self.body)
+            self.encodings["gzip"] = gzip.compress(self.body, compresslevel=SNAPSHOT_GZIP_LEVEL, mtime=0)
+
+    def response(self, accept_encoding: Optional[str], headers: Dict[str, str]) -> Response:
+        """Serve the stored bytes as-is, compressed if the client accepts it."""
+        headers = {**headers, "Vary": "Accept-Encoding"}
+        accepted = accepted_encodings(accept_encoding)
+        for coding, body in self.encodings.items():
+            if coding in accepted:
+                headers["Content-Encoding"] = coding
+                return Response(content=body, media_type="application/json", headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+class SnapshotCache:
+    """
+    Encoded responses keyed by (key, version).
+
+    A lookup with a newer version misses and replaces the old snapshot, so
+    bumping the version is all the invalidation needed; `invalidate` just frees
+    the memory sooner.
+    """
+
+    def __init__(self, name: str, max_entries: int = SNAPSHOT_MAX_ENTRIES):
+        self.name = name
+        self._entries: Dict[Hashable, Tuple[Any, Snapshot]] = BoundedDict(max_entries)
+
+    def get(self, key: Hashable, version: Any) -> Optional[Snapshot]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            cache_requests.inc(cache=self.name, result="miss")
+            return None
+        cache_requests.inc(cache=self.name, result="hit")
+        return entry[1]
+
+    def set(self, key: Hashable, version: Any, content: Any) -> Snapshot:
+        snapshot = Snapshot(content)
+        self._entries.pop(key, None)
+        self._entries[key] = (version, snapshot)
+        return snapshot
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+seat_map_snapshots = SnapshotCache("seat_map_snapshots")
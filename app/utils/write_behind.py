@@ -0,0 +1,108 @@
+# app/utils/write_behind.py
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+from decouple import config
+from pymongo import UpdateOne
+from app.database import event_stats_collection
+from app.utils.metrics import write_behind_flushes, write_behind_pending
+
+logger = logging.getLogger(__name__)
+
+# Increments not yet written are lost if the worker dies, at most this many seconds' worth
+WRITE_BEHIND_FLUSH_SECONDS = config("WRITE_BEHIND_FLUSH_SECONDS", default=5, cast=float)
+# Flush early once this many documents have pending increments
+WRITE_BEHIND_MAX_KEYS = config("WRITE_BEHIND_MAX_KEYS", default=10000, cast=int)
+
+_Key = Tuple[Tuple[str, Any], ...]
+
+class WriteBehindCounter:
+    """
+    Accumulates `$inc` increments in memory and writes them in bulk.
+
+    Only for counters that may lag and lose a few seconds of increments on a
+    crash (views, quote counts). Each flush is one unordered bulk_write with an
+    upserted `$inc` per document touched, so the write rate follows the number
+    of distinct documents, not the number of requests.
+    """
+
+    def __init__(self, name: str, collection, max_keys: int = WRITE_BEHIND_MAX_KEYS):
+        self.name = name
+        self.collection = collection
+        self.max_keys = max_keys
+        self._pending: Dict[_Key, Dict[str, float]] = {}
+        self._flushing = None
+        _counters.append(self)
+
+    def add(self, filter: Dict[str, Any], increments: Dict[str, float]) -> None:
+        """Queue `increments` for the document matching `filter`; never touches the database."""
+        key = tuple(sorted(filter.items()))
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = {}
+            write_behind_pending.inc(name=self.name)
+        for field, amount in increments.items():
+            pending[field] = pending.get(field, 0) + amount
+        if len(self._pending) >= self.max_keys and self._flushing is None:
+            self._flushing = asyncio.ensure_future(self.flush())
+            self._flushing.add_done_callback(lambda _: setattr(self, "_flushing", None))
+
+    async def flush(self) -> None:
+        """Write everything pending; on failure it is kept for the next flush."""
+        batch, self._pending = self._pending, {}
+        write_behind_pending.dec(len(batch), name=self.name)
+        if not batch:
+            return
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(dict(key), {"$inc": increments, "$set": {"updated_at": now}}, upsert=True)
+            for key, increments in batch.items()
+        ]
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception:
+            write_behind_flushes.inc(name=self.name, result="error")
+            logger.warning("Flushing %s failed; keeping %d pending documents", self.name, len(batch), exc_info=True)
+            self._restore(batch)
+            return
+        except BaseException:
+            # Cancelled mid-flush: keep the batch for the next flush rather than drop it.
+            # The bulk write may have been applied already, so this can over-count.
+            self._restore(batch)
+            raise
+        write_behind_flushes.inc(name=self.name, result="ok")
+
+    def _restore(self, batch: Dict[_Key, Dict[str, float]]) -> None:
+        for key, increments in batch.items():
+            if key not in self._pending:
+                if len(self._pending) >= self.max_keys:
+                    # Memory stays bounded while the database is unreachable
+                    continue
+                self._pending[key] = {}
+                write_behind_pending.inc(name=self.name)
+            pending = self._pending[key]
+            for field, amount in increments.items():
+                pending[field] = pending.get(field, 0) + amount
+
+_counters: List[WriteBehindCounter] = []
+
+async def flush_all() -> None:
+    await asyncio.gather(*(counter.flush() for counter in _counters))
+
+async def run_write_behind(interval: float = WRITE_BEHIND_FLUSH_SECONDS) -> None:
+    """Flush every write-behind counter periodically, and once more when cancelled."""
+    flushing = None
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            # Shielded so a shutdown arriving mid-flush lets that batch finish writing
+            flushing = asyncio.ensure_future(flush_all())
+            await asyncio.shield(flushing)
+    finally:
+        if flushing is not None and not flushing.done():
+            await flushing
+        await flush_all()
+
+# Per-event activity: seat-map views and quotes
+event_stats = WriteBehindCounter("event_stats", event_stats_collection)
@@ -0,0 +1,117 @@
+# benchmarks/asgi_client.py
+"""Minimal in-process ASGI client, so benchmarks drive the real app without a server."""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+
+class Response:
+    def __init__(self, status_code: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.status_code = status_code
+        self.headers = {key.decode().lower(): value.decode() for key, value in headers}
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class ASGIClient:
+    """Sends requests straight into an ASGI app and runs its lifespan."""
+
+    def __init__(self, app):
+        self.app = app
+        self._tasks = set()
+        self._lifespan_task = None
+        self._lifespan_receive: Optional[asyncio.Queue] = None
+        self._lifespan_send: Optional[asyncio.Queue] = None
+
+    async def __aenter__(self) -> "ASGIClient":
+        self._lifespan_receive = asyncio.Queue()
+        self._lifespan_send = asyncio.Queue()
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan_task = asyncio.create_task(
+            self.app(scope, self._lifespan_receive.get, self._lifespan_send.put)
+        )
+        await self._lifespan_receive.put({"type": "lifespan.startup"})
+        message = await self._lifespan_send.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"App startup failed: {message.get('message')}")
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        # Background tasks (e.g. reservation expiry) may still be sleeping
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._lifespan_receive.put({"type": "lifespan.shutdown"})
+        await self._lifespan_send.get()
+        await self._lifespan_task
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json_body: Any = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        client_ip: str = "127.0.0.1",
+    ) -> Response:
+        body = json.dumps(json_body).encode() if json_body is not None else b""
+        raw_headers = [(b"host", b"benchmark"), (b"content-length", str(len(body)).encode())]
+        if json_body is not None:
+            raw_headers.append((b"content-type", b"application/json"))
+        for key, value in (headers or {}).items():
+            raw_headers.append((key.lower().encode(), value.encode()))
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params or {}).encode(),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": (client_ip, 50000),
+            "server": ("benchmark", 80),
+            "state": {},
+        }
+
+        loop = asyncio.get_running_loop()
+        response_done = loop.create_future()
+        request_sent = False
+        status_code = 500
+        response_headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.shield(response_done)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status_code, response_headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False) and not response_done.done():
+                    response_done.set_result(None)
+
+        # The app call keeps running after the response for background tasks
+        task = asyncio.create_task(self.app(scope, receive, send))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        await asyncio.wait({response_done, task}, return_when=asyncio.FIRST_COMPLETED)
+        if not response_done.done():
+            task.result()  # Re-raise whatever the app raised
+            raise RuntimeError(f"{method} {path} finished without a response")
+        return Response(status_code, response_headers, b"".join(chunks))
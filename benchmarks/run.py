@@ -0,0 +1,353 @@
+# benchmarks/run.py
+"""
+Load-test harness for the ticketing app.
+
+Drives the real FastAPI app in-process through an ASGI client, against either
+a local mongod (MONGO_URI) or mongomock-motor, and reports latency percentiles,
+throughput, oversells and DB operations per request for each scenario.
+
+    python -m benchmarks.run --backend mongomock
+    python -m benchmarks.run --backend mongod --scenarios reserve_contention seat_map_reads
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+BENCH_DB_NAME = "event_ticketing_bench"
+SCENARIOS = ("login_storm", "reserve_contention", "confirm_cancel_mix", "seat_map_reads")
+
+
+class OpCounter:
+    """
+    Counts DB operations issued while handling requests, whichever backend is in use.
+
+    Operations are read from the app's per-request attribution (route_stats), so
+    background work such as lease renewals, the expiry sweeper, demand-pricing
+    refreshes, reconciliation and change streams is left out of the figures.
+    """
+
+    @property
+    def count(self) -> int:
+        from app.utils.instrumentation import route_stats
+
+        return sum(stats.db_ops for stats in list(route_stats.values()))
+
+    def install_mongomock(self) -> None:
+        """mongomock emits no command events; record its calls in the current request's stats."""
+        from mongomock.collection import Collection
+        from app.utils.instrumentation import current_request_stats
+
+        _patch_mongomock_bulk_write(Collection)
+        local = threading.local()
+        # mongomock implements some operations on top of others (find_one -> find),
+        # so only the outermost call is counted
+        for name in (
+            "find", "find_one", "insert_one", "insert_many", "update_one", "update_many",
+            "delete_one", "delete_many", "aggregate", "count_documents", "find_one_and_update",
+            "find_one_and_delete", "find_one_and_replace", "bulk_write", "create_index", "replace_one",
+            "distinct",
+        ):
+            original = getattr(Collection, name)
+
+            def make_wrapper(name, original):
+                def wrapper(collection, *args, **kwargs):
+                    stats = current_request_stats.get()
+                    if stats is not None and getattr(local, "depth", 0) == 0:
+                        stats.commands.append(f"{name} {collection.name}")
+                    local.depth = getattr(local, "depth", 0) + 1
+                    try:
+                        return original(collection, *args, **kwargs)
+                    finally:
+                        local.depth -= 1
+                return wrapper
+
+            setattr(Collection, name, make_wrapper(name, original))
+
+
+def _patch_mongomock_bulk_write(Collection) -> None:
+    """
+    Apply bulk_write requests one at a time.
+
+    mongomock's own bulk_write rejects the arguments current pymongo request
+    objects pass it (e.g. UpdateOne's `sort`), which breaks the write-behind
+    counters. Counted as a single operation, like the one command it replaces.
+    """
+    from pymongo import InsertOne, UpdateMany, UpdateOne
+    from pymongo.results import BulkWriteResult
+
+    def bulk_write(collection, requests, ordered=True, **kwargs):
+        inserted, matched, modified, upserted = 0, 0, 0, []
+        for index, request in enumerate(requests):
+            if isinstance(request, InsertOne):
+                collection.insert_one(request._doc)
+                inserted += 1
+            elif isinstance(request, (UpdateOne, UpdateMany)):
+                update = collection.update_one if isinstance(request, UpdateOne) else collection.update_many
+                result = update(request._filter, request._doc, upsert=bool(request._upsert))
+                matched += result.matched_count
+                modified += result.modified_count
+                if result.upserted_id is not None:
+                    upserted.append({"index": index, "_id": result.upserted_id})
+            else:
+                raise NotImplementedError(f"bulk_write with {type(request).__name__} under mongomock")
+        return BulkWriteResult({
+            "nInserted": inserted, "nMatched": matched, "nModified": modified,
+            "nUpserted": len(upserted), "upserted": upserted, "nRemoved": 0,
+        }, True)
+
+    Collection.bulk_write = bulk_write
+
+
+def _disable_change_streams() -> None:
+    """mongomock has no change streams; caches then rely on their TTLs, as on a standalone mongod."""
+    from app.utils.coordination import invalidator
+
+    async def run() -> None:
+        return None
+
+    invalidator.run = run
+
+
+def setup_backend(backend: str) -> OpCounter:
+    """Point the app at the chosen backend; must run before `app` is imported."""
+    counter = OpCounter()
+    os.environ["MONGO_DB"] = BENCH_DB_NAME
+    # Scenarios deliberately exceed per-user rates; measure the app, not the limiter
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    # ...nor load shedding, which mongomock's blocking calls would trigger
+    os.environ.setdefault("ADMISSION_CONTROL_ENABLED", "false")
+    if backend == "mongomock":
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+        counter.install_mongomock()
+        _disable_change_streams()
+    return counter
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class Bench:
+    def __init__(self, client, counter: OpCounter, concurrency: int):
+        self.client = client
+        self.counter = counter
+        self.concurrency = concurrency
+
+    async def measure(self, name: str, calls: List[Callable[[], Awaitable[Any]]]) -> Dict[str, Any]:
+        """Run `calls` with bounded concurrency and summarise their latencies."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        latencies: List[float] = []
+        statuses: Counter = Counter()
+
+        async def timed(call):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await call()
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[response.status_code] += 1
+
+        ops_before = self.counter.count
+        start = time.perf_counter()
+        await asyncio.gather(*(timed(call) for call in calls))
+        elapsed = time.perf_counter() - start
+        ops = self.counter.count - ops_before
+
+        return {
+            "scenario": name,
+            "requests": len(calls),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "throughput_rps": round(len(calls) / elapsed, 1) if elapsed else 0.0,
+            "db_ops_per_request": round(ops / len(calls), 2) if calls else 0.0,
+            "statuses": dict(statuses),
+        }
+
+    async def register(self, username: str, role: str) -> str:
+        password = "bench-password"
+        await self.client.request("POST", "/auth/register", json_body={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": password,
+            "role": role,
+        })
+        response = await self.client.request("POST", "/auth/login", json_body={
+            "username": username, "password": password
+        })
+        return response.json()["access_token"]
+
+    async def create_event(self, manager_token: str, seat_count: int) -> str:
+        seats = {f"S{i}": ("VIP" if i < seat_count // 10 else "Standard") for i in range(seat_count)}
+        response = await self.client.request("POST", "/manager/create-event", json_body={
+            "event_id": str(uuid.uuid4()),
+            "title": "Benchmark event",
+            "description": None,
+            "date": (datetime.now(timezone.utc) + timedelta(days=14)).isoformat(),
+            "location": "Benchmark hall",
+            "vip_price": 150.0,
+            "standard_price": 60.0,
+            "seats": seats,
+        }, headers=auth(manager_token))
+        return response.json()["id"]
+
+    async def oversell_count(self, event_id: str) -> int:
+        """Seats held by more than one live reservation or ticket."""
+        from app.database import tickets_collection
+
+        tickets = await tickets_collection.find(
+            {"event_id": event_id, "status": {"$in": ["reserved", "booked"]}},
+            {"_id": 0, "seat_numbers": 1}
+        ).to_list(length=None)
+        holders = Counter(seat for ticket in tickets for seat in ticket["seat_numbers"])
+        return sum(count - 1 for count in holders.values() if count > 1)
+
+
+def auth(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def login_storm(bench: Bench, scale: int) -> List[Dict[str, Any]]:
+    usernames = [f"storm-{uuid.uuid4().hex[:8]}" for _ in range(max(scale // 10, 1))]
+    for username in usernames:
+        await bench.register(username, "customer")
+
+    calls = [
+        (lambda username=usernames[i % len(usernames)]: bench.client.request(
+            "POST", "/auth/login",
+            json_body={"username": username, "password": "bench-password"},
+            client_ip=f"10.0.{i % 250}.1",
+        ))
+        for i in range(scale * 2)
+    ]
+    return [await bench.measure("login_storm", calls)]
+
+
+async def reserve_contention(bench: Bench, scale: int, manager_token: str, customer_tokens: List[str]) -> List[Dict[str, Any]]:
+    event_id = await bench.create_event(manager_token, seat_count=100)
+    contested = ["S50", "S51"]
+    calls = [
+        (lambda token=customer_tokens[i % len(customer_tokens)]: bench.client.request(
+            "POST", "/customer/reserve", params={"event_id": event_id},
+            json_body={"seat_numbers": contested}, headers=auth(token),
+        ))
+        for i in range(scale)
+    ]
+    result = await bench.measure("reserve_contention", calls)
+    result["oversold_seats"] = await bench.oversell_count(event_id)
+    return [result]
+
+
+async def confirm_cancel_mix(bench: Bench, scale: int, manager_token: str, customer_tokens: List[str]) -> List[Dict[str, Any]]:
+    event_id = await bench.create_event(manager_token, seat_count=scale * 2)
+    reservations = []
+    for i in range(scale):
+        token = customer_tokens[i % len(customer_tokens)]
+        response = await bench.client.request(
+            "POST", "/customer/reserve", params={"event_id": event_id},
+            json_body={"seat_numbers": [f"S{2 * i}", f"S{2 * i + 1}"]}, headers=auth(token),
+        )
+        if response.status_code == 200:
+            reservations.append((token, response.json()["reservation_id"]))
+
+    # Three out of four pay; the rest abandon at the payment step
+    confirm_calls = [
+        (lambda token=token, reservation_id=reservation_id, paid=(i % 4 != 3): bench.client.request(
+            "POST", "/customer/confirm",
+            json_body={"reservation_id": reservation_id, "payment_status": "payment done" if paid else "failed"},
+            headers=auth(token),
+        ))
+        for i, (token, reservation_id) in enumerate(reservations)
+    ]
+    confirm = await bench.measure("confirm_cancel_mix:confirm", confirm_calls)
+
+    cancel_calls = [
+        (lambda token=token, reservation_id=reservation_id: bench.client.request(
+            "POST", "/customer/cancel", json_body={"ticket_id": reservation_id}, headers=auth(token),
+        ))
+        for i, (token, reservation_id) in enumerate(reservations) if i % 2 == 0
+    ]
+    cancel = await bench.measure("confirm_cancel_mix:cancel", cancel_calls)
+    cancel["oversold_seats"] = await bench.oversell_count(event_id)
+    return [confirm, cancel]
+
+
+async def seat_map_reads(bench: Bench, scale: int, manager_token: str, customer_tokens: List[str]) -> List[Dict[str, Any]]:
+    event_id = await bench.create_event(manager_token, seat_count=5000)
+    calls = [
+        (lambda token=customer_tokens[i % len(customer_tokens)]: bench.client.request(
+            "GET", f"/customer/event-seats/{event_id}", headers=auth(token),
+        ))
+        for i in range(scale)
+    ]
+    return [await bench.measure("seat_map_reads", calls)]
+
+
+async def main(args) -> List[Dict[str, Any]]:
+    counter = setup_backend(args.backend)
+
+    from app.database import get_client
+    from app.main import app
+    from benchmarks.asgi_client import ASGIClient
+
+    if args.backend == "mongod":
+        await get_client().drop_database(BENCH_DB_NAME)
+
+    results: List[Dict[str, Any]] = []
+    async with ASGIClient(app) as client:
+        bench = Bench(client, counter, args.concurrency)
+        manager_token = await bench.register(f"manager-{uuid.uuid4().hex[:8]}", "manager")
+        customer_tokens = [
+            await bench.register(f"customer-{uuid.uuid4().hex[:8]}", "customer")
+            for _ in range(args.customers)
+        ]
+
+        for scenario in args.scenarios:
+            if scenario == "login_storm":
+                result = await login_storm(bench, args.scale)
+            else:
+                result = await globals()[scenario](bench, args.scale, manager_token, customer_tokens)
+            results.extend(result)
+
+    if args.backend == "mongod":
+        await get_client().drop_database(BENCH_DB_NAME)
+    return results
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    columns = ("scenario", "requests", "p50_ms", "p99_ms", "throughput_rps", "db_ops_per_request", "oversold_seats")
+    print(" | ".join(f"{column:>18}" for column in columns))
+    for result in results:
+        print(" | ".join(f"{str(result.get(column, '-')):>18}" for column in columns))
+        print(f"{'':>18}   statuses: {result['statuses']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("mongod", "mongomock"), default="mongod")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--scale", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--customers", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(results)
@@ -0,0 +1,56 @@
+# tests/test_projections.py
+"""Every Mongo read in app/ must pass a named projection from app.utils.projections."""
+import ast
+from pathlib import Path
+
+from app.utils import projections
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+# Read method -> position of the projection argument when passed positionally
+READ_METHODS = {
+    "find": 1,
+    "find_one": 1,
+    "find_one_and_delete": 1,
+    "find_one_and_update": 2,
+    "find_one_and_replace": 2,
+}
+
+def _read_calls():
+    for path in sorted(APP_DIR.rglob("*.py")):
+        tree = ast.parse(path.read_text(), filename=str(path))
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+                continue
+            if node.func.attr not in READ_METHODS:
+                continue
+            # Proxies forwarding *args/**kwargs to the driver are not call sites
+            if any(isinstance(arg, ast.Starred) for arg in node.args) or any(kw.arg is None for kw in node.keywords):
+                continue
+            yield f"{path.relative_to(APP_DIR.parent)}:{node.lineno}", node
+
+def _projection(node: ast.Call):
+    for keyword in node.keywords:
+        if keyword.arg == "projection":
+            return keyword.value
+    position = READ_METHODS[node.func.attr]
+    return node.args[position] if len(node.args) > position else None
+
+def test_reads_pass_a_projection():
+    missing = [where for where, node in _read_calls() if _projection(node) is None]
+    assert not missing, f"reads without a projection: {missing}"
+
+def test_projections_are_named():
+    inline = [
+        where for where, node in _read_calls()
+        if isinstance(_projection(node), (ast.Dict, ast.List, ast.Tuple, ast.Set))
+    ]
+    assert not inline, f"inline projections; add them to app/utils/projections.py: {inline}"
+
+def test_projections_select_fields():
+    # {"_id": 0} alone excludes one field and returns the rest of the document
+    whole = [
+        name for name, value in vars(projections).items()
+        if name.isupper() and isinstance(value, dict) and not any(value.values())
+    ]
+    assert not whole, f"projections returning whole documents: {whole}"